@@ -20,8 +20,84 @@ class Settings(BaseSettings):
     app_name: str = "Task Manager API"
     debug: bool = True
     
+    # Task listing and bulk writes
+    task_count_estimate_min: int = 10000  # Planner estimates below this are replaced by an exact count
+    tasks_bulk_chunk_size: int = 500  # Rows per statement in /tasks/bulk
+    
     # AI - Gemini API
     gemini_api_key: str = ""
+    ai_model: str = "gemini-1.5-flash"
+    llm_backend: str = "gemini"  # gemini | fake (synthetic responses for offline load tests)
+    ai_max_concurrency: int = 4  # Max Gemini calls in flight per worker
+    ai_call_timeout: float = 10.0  # Seconds before a Gemini call is abandoned
+    ai_slow_call_threshold: float = 5.0  # Calls slower than this count as failures for the breaker
+    ai_breaker_failure_threshold: int = 5  # Consecutive failed/slow calls that open the circuit
+    ai_breaker_reset_timeout: float = 30.0  # Seconds the circuit stays open before a probe
+    ai_rate_limit_rps: float = 5.0  # Gemini requests/sec per worker, 0 disables
+    ai_rate_limit_burst: int = 10
+    ai_rate_limit_tpm: int = 250000  # Estimated prompt tokens/min per worker, 0 disables
+    ai_rate_limit_max_wait: float = 2.0  # Seconds a call may queue before it is shed to the fallback
+    ai_daily_request_budget: int = 0  # Gemini calls per day per worker, 0 = unlimited
+    ai_daily_token_budget: int = 0  # Estimated prompt tokens per day per worker, 0 = unlimited
+    ai_hedge_enabled: bool = False  # Race slow parse calls against a backup call
+    ai_hedge_percentile: float = 0.95  # Hedge once a call is slower than this latency percentile
+    ai_hedge_min_delay: float = 0.3  # Seconds; never hedge sooner than this
+    ai_hedge_budget: float = 0.05  # Max extra calls as a fraction of hedge-eligible calls
+    ai_parse_cache_size: int = 1024  # 0 disables the parse cache
+    ai_parse_cache_ttl: int = 3600  # Seconds
+    ai_persistent_cache_enabled: bool = True  # Shared AI result cache in the database
+    ai_persistent_cache_ttl: int = 86400  # Seconds
+    ai_cache_sweep_interval: int = 300  # Seconds between expired-entry sweeps
+    ai_parse_batch_size: int = 20  # Max texts packed into one Gemini prompt
+    ai_local_parse_threshold: float = 0.85  # Skip Gemini when the local parse is this confident
+    ai_microbatch_window_ms: int = 10  # Window for merging concurrent /ai/parse calls, 0 disables
+    ai_prompt_input_tokens: int = 300  # Natural-language parse inputs are cut to this many tokens
+    ai_prompt_field_tokens: int = 40  # Titles/descriptions in task-list prompts are cut to this many tokens
+    ai_insights_context_tokens: int = 200  # Budget for the recent-task list in insights prompts
+    ai_rerank_top_k: int = 10  # Top locally-ranked tasks the AI may re-rank in /ai/prioritize
+    ai_prioritize_chunk_size: int = 20  # Max tasks per prioritization prompt; larger sets run as a tournament
+    ai_prioritize_chunk_tokens: int = 1500  # Estimated task-list tokens per prioritization prompt
+    ai_prioritize_parallelism: int = 4  # Chunks ranked concurrently per request
+    
+    # Priority scheduling of Gemini calls (interactive > standard > bulk)
+    ai_share_interactive: float = 1.0  # Fraction of ai_max_concurrency each class may hold
+    ai_share_standard: float = 0.75
+    ai_share_bulk: float = 0.25
+    ai_queue_limit_interactive: int = 100  # Calls waiting for a slot before new ones are rejected
+    ai_queue_limit_standard: int = 50
+    ai_queue_limit_bulk: int = 1000
+    ai_queue_deadline_interactive: float = 3.0  # Seconds a call may wait for a slot, 0 = no limit
+    ai_queue_deadline_standard: float = 10.0
+    ai_queue_deadline_bulk: float = 0.0
+    
+    # Write-first /ai/parse-and-create with background AI enrichment
+    ai_write_first: bool = False  # Default mode when the request doesn't choose
+    ai_enrichment_workers: int = 2
+    ai_enrichment_max_attempts: int = 5
+    ai_enrichment_retry_delay: float = 30.0  # Seconds, doubled per attempt
+    ai_enrichment_lease: float = 300.0  # Seconds a worker holds a task it is enriching
+    
+    # /ai/insights caching - responses are keyed on the tasks table version
+    ai_insights_min_change: float = 0.1  # Regenerate the AI summary once counts move by this fraction of all tasks
+    ai_insights_max_age: int = 21600  # Seconds; regenerate the AI summary at least this often
+    
+    # Fake LLM backend (llm_backend=fake)
+    fake_llm_latency_ms: float = 300.0  # Median call latency
+    fake_llm_latency_p99_ms: float = 1500.0  # 99th percentile latency; equal to the median for a fixed latency
+    fake_llm_error_rate: float = 0.0  # Fraction of calls that fail
+    fake_llm_seed: int = 0  # Non-zero makes latencies and failures reproducible
+    fake_llm_responses: str = ""  # Optional JSON file of canned responses: [{"match": regex, "response": text}]
+    
+    # Local category classifier
+    category_model_min_samples: int = 20  # Examples needed before predictions are trusted
+    ai_classifier_threshold: float = 0.8  # Skip Gemini when the classifier is this confident
+    
+    # Bulk re-categorization jobs
+    backfill_batch_size: int = 25  # Tasks per Gemini prompt
+    backfill_concurrency: int = 2  # Concurrent Gemini prompts per job
+    backfill_retry_delay: float = 5.0  # Seconds before retrying a page the AI couldn't fully categorize
+    backfill_retry_max_delay: float = 300.0  # Backoff doubles up to this
+    backfill_max_attempts: int = 5  # Tries at a task before skipping it (or failing the job if the AI is unavailable)
     
     class Config:
         env_file = ".env"
@@ -8,7 +8,8 @@ from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy import text
 
 from app.config import settings
-from app.database import engine, Base, SessionLocal
+from app.database import engine, SessionLocal
+from app.migrations import run_migrations
 from app.routers import tasks, ai
 from app.schemas import HealthResponse
 
@@ -26,15 +27,35 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting Task Manager API...")
     
-    # Create database tables
-    logger.info("Creating database tables...")
-    Base.metadata.create_all(bind=engine)
-    logger.info("Database tables created successfully")
+    # Create or upgrade the database schema
+    logger.info("Applying database migrations...")
+    applied = run_migrations(engine)
+    logger.info(f"Database schema up to date (applied: {applied or 'none'})")
+    
+    # Train the local category classifier from the tasks table
+    from app.services.classifier import train_classifier
+    train_classifier()
+    
+    # Evict expired entries from the shared AI cache
+    from app.services.ai_service import ai_service
+    ai_service.persistent_cache.start_sweeper(settings.ai_cache_sweep_interval)
+    
+    # Pick up re-categorization jobs left unfinished by earlier processes
+    from app.services.backfill import backfill_runner
+    backfill_runner.watch()
+    
+    # Resume background enrichment of write-first tasks
+    from app.services.enrichment import enrichment_worker
+    await enrichment_worker.start()
     
     yield
     
     # Shutdown
     logger.info("Shutting down Task Manager API...")
+    await enrichment_worker.stop()
+    await backfill_runner.stop()
+    await ai_service.persistent_cache.stop()
+    ai_service.shutdown()
 
 
 # Create FastAPI application
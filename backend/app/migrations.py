@@ -0,0 +1,196 @@
+"""
+Versioned Schema Migrations
+
+Applied in order at startup (or with `python -m app.migrations`); each
+version is recorded in the schema_migrations table and runs once. Write
+every migration so it is safe to re-run - a fresh database already has
+the current schema from the models, and a crash can leave one half done.
+"""
+import logging
+import time
+from datetime import datetime
+from typing import Callable, List, Optional
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+from app.database import Base
+import app.models  # noqa: F401 - registers the tables on Base.metadata
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary key for the PostgreSQL advisory lock that serializes migrating workers
+LOCK_KEY = 728_391_004
+# Seconds between attempts to take the lock while another worker migrates
+LOCK_POLL_INTERVAL = 1.0
+
+
+class Migration:
+    """One schema change; non-transactional ones run in autocommit mode"""
+
+    __slots__ = ("version", "name", "upgrade", "transactional")
+
+    def __init__(self, version: int, name: str, upgrade: Callable[[Connection], None], transactional: bool = True):
+        self.version = version
+        self.name = name
+        self.upgrade = upgrade
+        self.transactional = transactional
+
+
+def _baseline(conn: Connection):
+    """Tables and columns added since the schema was only managed by create_all"""
+    # Creates whatever tables are missing - everything on a fresh database
+    Base.metadata.create_all(bind=conn)
+
+    columns = {column["name"] for column in inspect(conn).get_columns("tasks")}
+    if "source_text" not in columns:
+        conn.execute(text("ALTER TABLE tasks ADD COLUMN source_text TEXT"))
+    if "enrichment_status" not in columns:
+        conn.execute(text("ALTER TABLE tasks ADD COLUMN enrichment_status VARCHAR(20)"))
+    # Its index is built online in _task_indexes
+
+
+def _create_index(conn: Connection, name: str, definition: str, where: Optional[str] = None):
+    """
+    CREATE INDEX IF NOT EXISTS, online on PostgreSQL.
+
+    CONCURRENTLY builds the index without blocking writes to the table. A
+    concurrent build that failed leaves an invalid index behind, which IF
+    NOT EXISTS would keep forever, so it is dropped and rebuilt.
+    """
+    postgres = conn.dialect.name == "postgresql"
+    if postgres:
+        invalid = conn.execute(
+            text(
+                "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE c.relname = :name AND NOT i.indisvalid"
+            ),
+            {"name": name}
+        ).first()
+        if invalid:
+            logger.warning(f"Rebuilding invalid index {name}")
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+
+    concurrently = "CONCURRENTLY " if postgres else ""
+    sql = f"CREATE INDEX {concurrently}IF NOT EXISTS {name} ON {definition}"
+    if where:
+        sql += f" WHERE {where}"
+    logger.info(f"Creating index {name}")
+    conn.execute(text(sql))
+
+
+def _task_indexes(conn: Connection):
+    """Indexes for the queries the API actually runs"""
+    open_tasks = "completed = false" if conn.dialect.name == "postgresql" else "completed = 0"
+    # GET /tasks pages (cursor and offset), with and without the completed filter
+    _create_index(conn, "ix_tasks_created_at_id", "tasks (created_at, id)")
+    _create_index(conn, "ix_tasks_completed_created_at", "tasks (completed, created_at DESC, id DESC)")
+    # Insights group-bys and category backfills
+    _create_index(conn, "ix_tasks_category", "tasks (category)")
+    _create_index(conn, "ix_tasks_priority", "tasks (priority)")
+    # Open tasks by due date
+    _create_index(conn, "ix_tasks_open_due_date", "tasks (due_date)", where=open_tasks)
+    # Pending write-first enrichment
+    _create_index(conn, "ix_tasks_enrichment_status", "tasks (enrichment_status)")
+
+
+def _backfill_claim_token(conn: Connection):
+    """Token of the worker holding a backfill job"""
+    columns = {column["name"] for column in inspect(conn).get_columns("backfill_jobs")}
+    if "claim_token" not in columns:
+        conn.execute(text("ALTER TABLE backfill_jobs ADD COLUMN claim_token VARCHAR(32)"))
+
+
+def _enrichment_lease(conn: Connection):
+    """Lease on tasks being enriched, so workers don't enrich the same task"""
+    columns = {column["name"] for column in inspect(conn).get_columns("tasks")}
+    if "enrichment_lease_until" not in columns:
+        conn.execute(text("ALTER TABLE tasks ADD COLUMN enrichment_lease_until TIMESTAMP"))
+
+
+def _category_source(conn: Connection):
+    """Whether each category was chosen by the user or guessed by a model"""
+    columns = {column["name"] for column in inspect(conn).get_columns("tasks")}
+    if "category_source" not in columns:
+        conn.execute(text("ALTER TABLE tasks ADD COLUMN category_source VARCHAR(10) DEFAULT 'model' NOT NULL"))
+        # Before this, only AI-created tasks had a category nobody chose
+        conn.execute(text("UPDATE tasks SET category_source = 'user' WHERE ai_generated = :false"), {"false": False})
+
+
+def _backfill_skipped(conn: Connection):
+    """Count of tasks a backfill job gave up on"""
+    columns = {column["name"] for column in inspect(conn).get_columns("backfill_jobs")}
+    if "skipped" not in columns:
+        conn.execute(text("ALTER TABLE backfill_jobs ADD COLUMN skipped INTEGER DEFAULT 0 NOT NULL"))
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "baseline tables and columns", _baseline),
+    Migration(2, "task access path indexes", _task_indexes, transactional=False),
+    Migration(3, "backfill job claim tokens", _backfill_claim_token),
+    Migration(4, "task enrichment leases", _enrichment_lease),
+    Migration(5, "task category sources", _category_source),
+    Migration(6, "backfill job skip counts", _backfill_skipped),
+]
+
+
+def _applied_versions(engine: Engine) -> set:
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "version INTEGER PRIMARY KEY, name VARCHAR(255) NOT NULL, applied_at TIMESTAMP NOT NULL)"
+        ))
+        return {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+
+def _apply(engine: Engine, migration: Migration):
+    logger.info(f"Applying migration {migration.version}: {migration.name}")
+    if migration.transactional:
+        with engine.begin() as conn:
+            migration.upgrade(conn)
+    else:
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            migration.upgrade(conn)
+
+    with engine.begin() as conn:
+        conn.execute(
+            text("INSERT INTO schema_migrations (version, name, applied_at) VALUES (:version, :name, :applied_at)"),
+            {"version": migration.version, "name": migration.name, "applied_at": datetime.utcnow()}
+        )
+
+
+def run_migrations(engine: Engine) -> List[int]:
+    """Apply pending migrations in version order; returns the versions applied"""
+    lock_conn = None
+    if engine.dialect.name == "postgresql":
+        # Workers starting together wait here instead of racing each other.
+        # They poll rather than block in pg_advisory_lock: a blocked
+        # statement holds a snapshot, which CREATE INDEX CONCURRENTLY in the
+        # lock holder would wait on forever. Between polls the connection
+        # sits idle outside any transaction.
+        lock_conn = engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+        waiting = False
+        while not lock_conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": LOCK_KEY}).scalar():
+            if not waiting:
+                logger.info("Waiting for another worker to finish migrating")
+                waiting = True
+            time.sleep(LOCK_POLL_INTERVAL)
+
+    try:
+        applied = _applied_versions(engine)
+        pending = [m for m in sorted(MIGRATIONS, key=lambda m: m.version) if m.version not in applied]
+        for migration in pending:
+            _apply(engine, migration)
+        return [m.version for m in pending]
+    finally:
+        if lock_conn is not None:
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": LOCK_KEY})
+            lock_conn.close()
+
+
+if __name__ == "__main__":
+    from app.database import engine
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    applied = run_migrations(engine)
+    print(f"Applied migrations: {applied}" if applied else "Schema is up to date")
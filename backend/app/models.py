@@ -2,7 +2,7 @@
 SQLAlchemy Database Models
 """
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Enum
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Enum, Index
 from app.database import Base
 import enum
 
@@ -26,6 +26,12 @@ class Category(str, enum.Enum):
     OTHER = "other"
 
 
+class CategorySource(str, enum.Enum):
+    """Who chose a task's category - the classifier only learns from users"""
+    USER = "user"
+    MODEL = "model"
+
+
 class Task(Base):
     """Task model representing a todo item"""
     
@@ -37,13 +43,82 @@ class Task(Base):
     completed = Column(Boolean, default=False, nullable=False)
     
     # AI-enhanced fields
-    priority = Column(String(20), default=Priority.MEDIUM.value, nullable=False)
-    category = Column(String(20), default=Category.OTHER.value, nullable=False)
+    priority = Column(String(20), default=Priority.MEDIUM.value, nullable=False, index=True)
+    category = Column(String(20), default=Category.OTHER.value, nullable=False, index=True)
+    category_source = Column(String(10), default=CategorySource.MODEL.value, nullable=False)
     due_date = Column(DateTime, nullable=True)
     ai_generated = Column(Boolean, default=False, nullable=False)
     
+    # Write-first AI creation: the original text, and whether background
+    # enrichment is still pending (null when not applicable)
+    source_text = Column(Text, nullable=True)
+    enrichment_status = Column(String(20), nullable=True, index=True)  # pending, done, failed, skipped
+    # A worker enriching a pending task holds it until then
+    enrichment_lease_until = Column(DateTime, nullable=True)
+    
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     
+    # Existing databases get new indexes from app/migrations.py
+    __table_args__ = (
+        # Keyset pagination of GET /tasks seeks and orders on (created_at, id)
+        Index("ix_tasks_created_at_id", "created_at", "id"),
+        # GET /tasks?completed=... newest first
+        Index("ix_tasks_completed_created_at", completed, created_at.desc(), id.desc()),
+        # Open tasks by due date (prioritization, overdue checks)
+        Index(
+            "ix_tasks_open_due_date",
+            due_date,
+            postgresql_where=(completed == False),
+            sqlite_where=(completed == False)
+        ),
+    )
+    
     def __repr__(self):
         return f"<Task(id={self.id}, title='{self.title}', priority={self.priority}, completed={self.completed})>"
+
+
+class AICacheEntry(Base):
+    """Persistent AI result cache shared by all workers"""
+    
+    __tablename__ = "ai_cache"
+    
+    key_hash = Column(String(64), primary_key=True)  # sha256 of namespace + canonical prompt key
+    model = Column(String(64), primary_key=True)
+    value = Column(Text, nullable=False)  # JSON-encoded result
+    expires_at = Column(DateTime, nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f"<AICacheEntry(key_hash={self.key_hash[:12]}, model={self.model}, expires_at={self.expires_at})>"
+
+
+class BackfillJob(Base):
+    """Background job that re-categorizes existing tasks in batches"""
+    
+    __tablename__ = "backfill_jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    status = Column(String(20), default="pending", nullable=False)  # pending, running, completed, failed, cancelled
+    
+    # Filter over tasks
+    category = Column(String(20), default=Category.OTHER.value, nullable=False)
+    completed = Column(Boolean, nullable=True)
+    
+    # Progress checkpoint - tasks are processed in id order
+    last_task_id = Column(Integer, default=0, nullable=False)
+    total = Column(Integer, default=0, nullable=False)
+    processed = Column(Integer, default=0, nullable=False)
+    updated = Column(Integer, default=0, nullable=False)
+    skipped = Column(Integer, default=0, nullable=False)  # Tasks the AI kept failing to categorize
+    error = Column(Text, nullable=True)
+    
+    # Refreshed while the job runs; a stale heartbeat means the owning worker died
+    heartbeat_at = Column(DateTime, nullable=True)
+    # Set by the worker holding the job; its writes check it is still theirs
+    claim_token = Column(String(32), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f"<BackfillJob(id={self.id}, status={self.status}, processed={self.processed}/{self.total})>"
@@ -1,21 +1,31 @@
 """
 AI Router - Endpoints for AI-powered features
 """
+import json
 import logging
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import AsyncIterator, List, Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 
+from app.config import settings
 from app.database import get_db
-from app.models import Task
+from app.models import Task, BackfillJob, CategorySource
 from app.schemas import (
     AIParseRequest, AIParseResponse, 
+    AIParseBatchRequest, AIParseBatchResponse,
     AIPrioritizeRequest, AIPrioritizeResponse,
     AIInsightsResponse, TaskCreate, MessageResponse,
+    BackfillRequest, BackfillJobResponse,
     Priority, Category
 )
-from app.services.ai_service import ai_service
+from app.services.ai_service import ai_service, parse_due_date
+from app.services.backfill import backfill_runner
+from app.services.classifier import category_classifier, user_example
+from app.services.enrichment import enrichment_worker
+from app.services.insights import InsightsEntry, insights_cache
 
 logger = logging.getLogger(__name__)
 
@@ -24,10 +34,15 @@ router = APIRouter(prefix="/ai", tags=["AI"])
 
 @router.get("/status")
 async def ai_status():
-    """Check if AI service is available"""
+    """Check if AI service is available and report its health counters"""
     return {
         "available": ai_service.is_available(),
-        "model": "gemini-1.5-flash" if ai_service.is_available() else None
+        "configured": ai_service.is_configured(),
+        "model": ai_service.model_name if ai_service.is_configured() else None,
+        "backend": ai_service.backend.name if ai_service.backend else None,
+        **ai_service.stats(),
+        "enrichment": enrichment_worker.stats(),
+        "insights_cache": insights_cache.stats()
     }
 
 
@@ -41,64 +56,128 @@ async def parse_natural_language(request: AIParseRequest):
     - "Urgent: finish project report by Friday"
     - "Buy groceries this weekend"
     """
-    result = await ai_service.parse_natural_language(request.text)
+    result = await ai_service.parse_natural_language(request.text, use_cache=request.use_cache)
+    return _to_parse_response(result)
+
+
+@router.post("/parse-batch", response_model=AIParseBatchResponse)
+async def parse_natural_language_batch(request: AIParseBatchRequest):
+    """
+    Parse many natural language texts into structured tasks.
     
-    return AIParseResponse(
-        title=result["title"],
-        description=result.get("description"),
-        priority=Priority(result.get("priority", "medium")),
-        category=Category(result.get("category", "other")),
-        due_date=result.get("due_date"),
-        confidence=result.get("confidence", 0.5)
-    )
+    Texts are packed into a few multi-item AI prompts; results are returned
+    in input order.
+    """
+    results = await ai_service.parse_batch(request.texts, use_cache=request.use_cache)
+    return AIParseBatchResponse(results=[_to_parse_response(r) for r in results])
 
 
 @router.post("/parse-and-create")
 async def parse_and_create_task(
     request: AIParseRequest,
+    response: Response,
+    write_first: Optional[bool] = Query(
+        None, description="Create the task immediately from the local parse and enrich it with AI in the background"
+    ),
     db: Session = Depends(get_db)
 ):
     """
     Parse natural language and create a task in one step.
+    
+    In write-first mode the task is inserted right away (201) from the local
+    parse; if that parse isn't confident, the task is marked
+    enrichment_status="pending" and refined by the AI in the background.
     """
-    # Parse the input
-    parsed = await ai_service.parse_natural_language(request.text)
+    if write_first is None:
+        write_first = settings.ai_write_first
     
-    # Create the task
-    from datetime import datetime
+    if write_first:
+        parsed = ai_service.parse_local(request.text)
+        task = _task_from_parsed(parsed)
+        if ai_service.is_configured() and parsed["confidence"] < settings.ai_local_parse_threshold:
+            task.source_text = request.text
+            task.enrichment_status = "pending"
+        response.status_code = status.HTTP_201_CREATED
+    else:
+        # Parse the input
+        parsed = await ai_service.parse_natural_language(request.text, use_cache=request.use_cache)
+        
+        # Create the task
+        task = _task_from_parsed(parsed)
     
-    due_date = None
-    if parsed.get("due_date"):
-        try:
-            due_date = datetime.fromisoformat(parsed["due_date"].replace("Z", "+00:00"))
-        except:
-            pass
+    db.add(task)
+    db.commit()
+    db.refresh(task)
+    
+    if task.enrichment_status == "pending":
+        enrichment_worker.enqueue(task.id)
+    
+    return {
+        "message": "Task created successfully",
+        "task": _created_task_data(task, parsed)
+    }
+
+
+@router.post("/parse-and-create-batch")
+async def parse_and_create_tasks_batch(
+    request: AIParseBatchRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Parse many natural language texts and create all tasks in one transaction.
+    """
+    parsed_items = await ai_service.parse_batch(request.texts, use_cache=request.use_cache)
     
-    task = Task(
+    tasks = [_task_from_parsed(parsed) for parsed in parsed_items]
+    db.add_all(tasks)
+    db.flush()
+    
+    # Build the response before commit expires the loaded attributes
+    created = [_created_task_data(task, parsed) for task, parsed in zip(tasks, parsed_items)]
+    db.commit()
+    
+    return {
+        "message": f"{len(created)} tasks created successfully",
+        "tasks": created
+    }
+
+
+def _to_parse_response(result: dict) -> AIParseResponse:
+    """Convert an AI service parse result into the API response model"""
+    return AIParseResponse(
+        title=result["title"],
+        description=result.get("description"),
+        priority=Priority(result.get("priority", "medium")),
+        category=Category(result.get("category", "other")),
+        due_date=result.get("due_date"),
+        confidence=result.get("confidence", 0.5)
+    )
+
+
+def _task_from_parsed(parsed: dict) -> Task:
+    """Build an (unsaved) AI-generated Task from a parse result"""
+    return Task(
         title=parsed["title"],
         description=parsed.get("description"),
         priority=parsed.get("priority", "medium"),
         category=parsed.get("category", "other"),
-        due_date=due_date,
+        due_date=parse_due_date(parsed.get("due_date")),
         ai_generated=True
     )
-    
-    db.add(task)
-    db.commit()
-    db.refresh(task)
-    
+
+
+def _created_task_data(task: Task, parsed: dict) -> dict:
+    """Response payload for a task created from a parse result"""
     return {
-        "message": "Task created successfully",
-        "task": {
-            "id": task.id,
-            "title": task.title,
-            "description": task.description,
-            "priority": task.priority,
-            "category": task.category,
-            "due_date": task.due_date.isoformat() if task.due_date else None,
-            "ai_generated": task.ai_generated,
-            "confidence": parsed.get("confidence", 0.5)
-        }
+        "id": task.id,
+        "title": task.title,
+        "description": task.description,
+        "priority": task.priority,
+        "category": task.category,
+        "due_date": task.due_date.isoformat() if task.due_date else None,
+        "ai_generated": task.ai_generated,
+        "enrichment_status": task.enrichment_status,
+        "confidence": parsed.get("confidence", 0.5)
     }
 
 
@@ -108,33 +187,83 @@ async def prioritize_tasks(
     db: Session = Depends(get_db)
 ):
     """
-    Get AI-powered prioritization for a list of tasks.
+    Prioritize a list of tasks.
+    
+    Tasks are ranked locally by due date, overdue status, priority, category
+    and age; the AI (use_ai) only re-ranks the top few and explains why.
+    
+    - **all_open**: Rank every open task instead of task_ids
+    - **offset** / **limit**: Page through the ranked result (total is returned)
+    """
+    tasks_data = _open_tasks_data(db, request)
+    
+    result = await ai_service.prioritize_tasks(
+        tasks_data, use_ai=request.use_ai, limit=request.limit, offset=request.offset
+    )
+    
+    return AIPrioritizeResponse(
+        prioritized_tasks=result["prioritized_tasks"],
+        reasoning=result["reasoning"],
+        total=len(tasks_data)
+    )
+
+
+@router.post("/prioritize/stream")
+async def prioritize_tasks_stream(
+    request: AIPrioritizeRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Stream a prioritization as server-sent events.
+    
+    Events: `order` (local ranking, sent immediately), `token` (AI reasoning
+    text as it is generated), `result` (final prioritized_tasks and reasoning).
     """
-    # Fetch tasks
-    tasks = db.query(Task).filter(
-        Task.id.in_(request.task_ids),
-        Task.completed == False
-    ).all()
+    tasks_data = _open_tasks_data(db, request)
+    return _event_stream(
+        ai_service.stream_prioritization(
+            tasks_data, use_ai=request.use_ai, limit=request.limit, offset=request.offset
+        )
+    )
+
+
+def _open_tasks_data(db: Session, request: AIPrioritizeRequest) -> List[dict]:
+    """Open tasks to prioritize in the shape the AI service expects; 404 if none"""
+    # Only the columns the ranking needs - all_open may cover thousands of rows
+    query = db.query(
+        Task.id, Task.title, Task.priority, Task.category, Task.due_date, Task.created_at
+    ).filter(Task.completed == False)
+    if not request.all_open:
+        query = query.filter(Task.id.in_(request.task_ids))
+    tasks = query.all()
     
     if not tasks:
         raise HTTPException(status_code=404, detail="No tasks found")
     
-    tasks_data = [
+    return [
         {
             "id": t.id,
             "title": t.title,
             "priority": t.priority,
             "category": t.category,
-            "due_date": t.due_date.isoformat() if t.due_date else None
+            "due_date": t.due_date.isoformat() if t.due_date else None,
+            "created_at": t.created_at.isoformat()
         }
         for t in tasks
     ]
+
+
+def _event_stream(events: AsyncIterator[Tuple[str, dict]]) -> StreamingResponse:
+    """Serve (event, data) pairs as server-sent events"""
+    async def encode():
+        async for event, data in events:
+            yield f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
     
-    result = await ai_service.prioritize_tasks(tasks_data)
-    
-    return AIPrioritizeResponse(
-        prioritized_tasks=result["prioritized_tasks"],
-        reasoning=result["reasoning"]
+    return StreamingResponse(
+        encode(),
+        media_type="text/event-stream",
+        # Proxies must not buffer, or nothing arrives until the end
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
 
@@ -144,7 +273,7 @@ async def auto_categorize_task(
     db: Session = Depends(get_db)
 ):
     """
-    Auto-categorize a task using AI.
+    Auto-categorize a task - local classifier first, AI when it is unsure.
     """
     task = db.query(Task).filter(Task.id == task_id).first()
     
@@ -153,11 +282,16 @@ async def auto_categorize_task(
     
     category = await ai_service.categorize_task(task.title, task.description or "")
     
-    # Update task
+    old_example = user_example(task.title, task.description, task.category, task.category_source)
+    
+    # Update task - a guessed category, so the classifier doesn't learn it
     task.category = category
+    task.category_source = CategorySource.MODEL.value
     db.commit()
     db.refresh(task)
     
+    category_classifier.relabel(old_example, None)
+    
     return {
         "message": "Task categorized successfully",
         "task_id": task_id,
@@ -165,11 +299,141 @@ async def auto_categorize_task(
     }
 
 
-@router.get("/insights", response_model=AIInsightsResponse)
-async def get_productivity_insights(db: Session = Depends(get_db)):
+@router.post("/backfill", response_model=BackfillJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def start_backfill(request: BackfillRequest, db: Session = Depends(get_db)):
+    """
+    Start a background job that re-categorizes existing tasks in bulk.
+    
+    - **category**: Only tasks currently in this category are processed (default: other)
+    - **completed**: Optionally restrict to completed / open tasks
+    """
+    if not ai_service.is_configured():
+        raise HTTPException(status_code=503, detail="AI is not configured")
+    
+    query = db.query(func.count(Task.id)).filter(Task.category == request.category.value)
+    if request.completed is not None:
+        query = query.filter(Task.completed == request.completed)
+    
+    job = BackfillJob(
+        category=request.category.value,
+        completed=request.completed,
+        total=query.scalar()
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    
+    backfill_runner.start(job.id)
+    return job
+
+
+@router.get("/backfill", response_model=List[BackfillJobResponse])
+def list_backfill_jobs(db: Session = Depends(get_db)):
+    """List re-categorization jobs, newest first"""
+    return db.query(BackfillJob).order_by(BackfillJob.id.desc()).limit(50).all()
+
+
+@router.get("/backfill/{job_id}", response_model=BackfillJobResponse)
+def get_backfill_job(job_id: int, db: Session = Depends(get_db)):
+    """Get the status and progress of a re-categorization job"""
+    job = db.query(BackfillJob).filter(BackfillJob.id == job_id).first()
+    
+    if not job:
+        raise HTTPException(status_code=404, detail="Backfill job not found")
+    
+    return job
+
+
+@router.post("/backfill/{job_id}/cancel", response_model=BackfillJobResponse)
+def cancel_backfill_job(job_id: int, db: Session = Depends(get_db)):
+    """Cancel a pending or running re-categorization job"""
+    job = db.query(BackfillJob).filter(BackfillJob.id == job_id).first()
+    
+    if not job:
+        raise HTTPException(status_code=404, detail="Backfill job not found")
+    
+    if job.status in ("pending", "running"):
+        job.status = "cancelled"
+        db.commit()
+        db.refresh(job)
+    
+    return job
+
+
+@router.get(
+    "/insights",
+    response_model=AIInsightsResponse,
+    responses={304: {"description": "Insights unchanged since the client's copy"}}
+)
+async def get_productivity_insights(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db)
+):
     """
     Get AI-powered productivity insights.
+    
+    Responses are cached until a task changes and carry ETag/Last-Modified;
+    send If-None-Match or If-Modified-Since to get a 304 when nothing changed.
     """
+    count, last_update = db.query(func.count(Task.id), func.max(Task.updated_at)).one()
+    entry = await insights_cache.get((count, last_update), lambda: _insights_stats(db))
+    
+    headers = {
+        "ETag": entry.etag,
+        "Last-Modified": format_datetime(entry.last_modified, usegmt=True),
+        # Browsers may keep the response but must revalidate before reuse
+        "Cache-Control": "private, no-cache"
+    }
+    if _not_modified(request, entry):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    response.headers.update(headers)
+    return AIInsightsResponse(**entry.body)
+
+
+def _not_modified(request: Request, entry: InsightsEntry) -> bool:
+    """Evaluate the request's conditional headers against a cached entry"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or entry.etag in tags or f"W/{entry.etag}" in tags
+    
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None:
+        try:
+            return entry.last_modified <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+@router.get("/insights/stream")
+async def get_productivity_insights_stream(db: Session = Depends(get_db)):
+    """
+    Stream productivity insights as server-sent events.
+    
+    Events: `stats` (task counts, sent immediately), `token` (AI summary and
+    tips text as it is generated), `insights` (final ai_summary and ai_tips).
+    """
+    tasks_data, stats = _insights_stats(db)
+    
+    async def events():
+        yield "stats", {
+            "total_tasks": stats["total"],
+            "completed_tasks": stats["completed"],
+            "completion_rate": stats["completion_rate"],
+            "tasks_by_category": stats["by_category"],
+            "tasks_by_priority": stats["by_priority"]
+        }
+        async for event in ai_service.stream_insights(tasks_data, stats):
+            yield event
+    
+    return _event_stream(events())
+
+
+def _insights_stats(db: Session) -> Tuple[List[dict], dict]:
+    """Recent tasks and aggregate counts for the insights endpoints"""
     # Calculate stats
     total = db.query(func.count(Task.id)).scalar()
     completed = db.query(func.count(Task.id)).filter(Task.completed == True).scalar()
@@ -190,9 +454,14 @@ async def get_productivity_insights(db: Session = Depends(get_db)):
     )
     by_priority = {pri: count for pri, count in priority_counts}
     
-    # Get recent tasks
-    recent_tasks = db.query(Task).order_by(Task.created_at.desc()).limit(10).all()
-    tasks_data = [{"title": t.title, "completed": t.completed} for t in recent_tasks]
+    # Get recent tasks - the prompt keeps the most relevant within its budget
+    recent_tasks = (
+        db.query(Task.title, Task.completed, Task.priority, Task.category, Task.due_date, Task.created_at)
+        .order_by(Task.created_at.desc())
+        .limit(30)
+        .all()
+    )
+    tasks_data = [dict(t._mapping) for t in recent_tasks]
     
     stats = {
         "total": total,
@@ -201,16 +470,4 @@ async def get_productivity_insights(db: Session = Depends(get_db)):
         "by_category": by_category,
         "by_priority": by_priority
     }
-    
-    # Get AI insights
-    ai_insights = await ai_service.generate_insights(tasks_data, stats)
-    
-    return AIInsightsResponse(
-        total_tasks=total,
-        completed_tasks=completed,
-        completion_rate=stats["completion_rate"],
-        tasks_by_category=by_category,
-        tasks_by_priority=by_priority,
-        ai_summary=ai_insights["ai_summary"],
-        ai_tips=ai_insights["ai_tips"]
-    )
+    return tasks_data, stats
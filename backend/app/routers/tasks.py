@@ -4,18 +4,34 @@ Task CRUD Endpoints
 import logging
 from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy import delete, insert, select, update
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
 
 from app.database import get_db
-from app.models import Task
+from app.models import CategorySource, Task
 from app.schemas import (
     TaskCreate,
     TaskUpdate,
     TaskResponse,
     TaskListResponse,
+    TaskBulkCreate,
+    TaskBulkUpdate,
+    TaskBulkDelete,
+    BulkResponse,
     MessageResponse
 )
+from app.services.ai_service import ai_service
+from app.services.bulk_tasks import (
+    SKIP_PENDING_ENRICHMENT,
+    bulk_create,
+    bulk_delete,
+    bulk_update,
+    column_values,
+    null_required_fields,
+    tasks_table
+)
+from app.services.classifier import category_classifier, user_example
+from app.services.pagination import NEXT, PREV, count_rows, encode_cursor, keyset_page
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -25,19 +41,28 @@ router = APIRouter(prefix="/tasks", tags=["Tasks"])
 
 @router.get("", response_model=TaskListResponse)
 def get_tasks(
-    skip: int = Query(0, ge=0, description="Number of tasks to skip"),
+    skip: int = Query(0, ge=0, description="Number of tasks to skip (offset mode)"),
     limit: int = Query(100, ge=1, le=100, description="Maximum number of tasks to return"),
     completed: Optional[bool] = Query(None, description="Filter by completion status"),
+    cursor: Optional[str] = Query(None, description="next_cursor or prev_cursor of a previous page (cursor mode)"),
+    include_total: bool = Query(True, description="Count the tasks matching the filter"),
+    exact_total: bool = Query(True, description="Set to false to accept a fast estimate for large totals"),
     db: Session = Depends(get_db)
 ):
     """
-    Get all tasks with optional filtering and pagination.
+    Get all tasks with optional filtering and pagination, newest first.
     
-    - **skip**: Number of tasks to skip (for pagination)
+    - **skip**: Number of tasks to skip (offset pagination)
     - **limit**: Maximum number of tasks to return (max 100)
     - **completed**: Filter by completion status (true/false)
+    - **cursor**: Continue from a page's next_cursor/prev_cursor instead of
+      skipping; stable under concurrent inserts and as fast on deep pages
+      as on the first. Pass the same filters on every page.
+    - **include_total**: Set to false to skip counting (total is null)
+    - **exact_total**: Set to false to allow a planner estimate on PostgreSQL
+      (total_exact is false when one was used)
     """
-    logger.info(f"Getting tasks with skip={skip}, limit={limit}, completed={completed}")
+    logger.info(f"Getting tasks with skip={skip}, limit={limit}, completed={completed}, cursor={cursor}")
     
     query = db.query(Task)
     
@@ -45,14 +70,35 @@ def get_tasks(
     if completed is not None:
         query = query.filter(Task.completed == completed)
     
-    # Get total count before pagination
-    total = query.count()
+    total, total_exact = None, None
     
-    # Apply pagination and ordering
-    tasks = query.order_by(desc(Task.created_at)).offset(skip).limit(limit).all()
+    if cursor is not None:
+        try:
+            tasks, next_cursor, prev_cursor = keyset_page(query, cursor, limit)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        if include_total:
+            total, total_exact = count_rows(query, exact_total)
+    else:
+        # Offset mode; the cursors let a client switch to keyset paging from here
+        # The count runs as its own narrow query: riding on the page as
+        # COUNT(*) OVER () would make PostgreSQL read and buffer every
+        # matching full row before LIMIT applies
+        fetched = query.order_by(Task.created_at.desc(), Task.id.desc()).offset(skip).limit(limit + 1).all()
+        if include_total:
+            total, total_exact = count_rows(query, exact_total)
+        tasks = fetched[:limit]
+        next_cursor = encode_cursor(tasks[-1], NEXT) if len(fetched) > limit else None
+        prev_cursor = encode_cursor(tasks[0], PREV) if skip and tasks else None
     
     logger.info(f"Retrieved {len(tasks)} tasks out of {total} total")
-    return TaskListResponse(tasks=tasks, total=total)
+    return TaskListResponse(
+        tasks=tasks,
+        total=total,
+        total_exact=total_exact,
+        next_cursor=next_cursor,
+        prev_cursor=prev_cursor
+    )
 
 
 @router.post("", response_model=TaskResponse, status_code=status.HTTP_201_CREATED)
@@ -63,28 +109,89 @@ def create_task(task_data: TaskCreate, db: Session = Depends(get_db)):
     - **title**: Task title (required, 1-255 characters)
     - **description**: Task description (optional)
     - **priority**: Task priority (low, medium, high, urgent)
-    - **category**: Task category (work, personal, health, finance, learning, errands, other)
+    - **category**: Task category (work, personal, health, finance, learning, errands, other);
+      when omitted, the local classifier's guess is used if it is confident
     - **due_date**: Due date (optional)
     """
     logger.info(f"Creating new task: {task_data.title}")
     
-    # Create new task instance
-    db_task = Task(
+    # Only a category the user chose is a training example; guesses would
+    # just feed the classifier its own predictions
+    source = CategorySource.USER if "category" in task_data.model_fields_set else CategorySource.MODEL
+    category = task_data.category.value
+    if source == CategorySource.MODEL:
+        category = ai_service.local_category(task_data.title, task_data.description) or category
+    
+    # INSERT ... RETURNING hands back the stored row, defaults included,
+    # without a second SELECT
+    conn = db.connection()
+    stmt = insert(tasks_table).values(
         title=task_data.title,
         description=task_data.description,
         priority=task_data.priority.value,
-        category=task_data.category.value,
+        category=category,
+        category_source=source.value,
         due_date=task_data.due_date,
         completed=False
     )
-    
-    # Add to database
-    db.add(db_task)
+    if conn.dialect.insert_returning:
+        task = conn.execute(stmt.returning(*tasks_table.c)).one()
+    else:
+        task_id = conn.execute(stmt).inserted_primary_key[0]
+        task = conn.execute(select(tasks_table).where(tasks_table.c.id == task_id)).one()
     db.commit()
-    db.refresh(db_task)
     
-    logger.info(f"Created task with id={db_task.id}")
-    return db_task
+    category_classifier.relabel(None, user_example(task.title, task.description, task.category, task.category_source))
+    
+    logger.info(f"Created task with id={task.id}")
+    return task
+
+
+def _bulk_response(results) -> BulkResponse:
+    succeeded = sum(result.status in ("created", "updated", "unchanged", "deleted") for result in results)
+    return BulkResponse(results=results, succeeded=succeeded, failed=len(results) - succeeded)
+
+
+@router.post("/bulk", response_model=BulkResponse, status_code=status.HTTP_201_CREATED)
+def create_tasks_bulk(request: TaskBulkCreate, db: Session = Depends(get_db)):
+    """
+    Create up to 10,000 tasks in one transaction.
+    
+    Rows are inserted with multi-row INSERTs; results list each new id in
+    request order.
+    """
+    logger.info(f"Bulk creating {len(request.tasks)} tasks")
+    response = _bulk_response(bulk_create(db, request.tasks))
+    logger.info(f"Bulk created {response.succeeded} tasks")
+    return response
+
+
+@router.patch("/bulk", response_model=BulkResponse)
+def update_tasks_bulk(request: TaskBulkUpdate, db: Session = Depends(get_db)):
+    """
+    Update up to 10,000 tasks in one transaction.
+    
+    Each item holds a task id and the fields to change. Items for missing
+    tasks, repeated ids or nulls in required fields are reported per item
+    and skipped; the rest are applied.
+    """
+    logger.info(f"Bulk updating {len(request.tasks)} tasks")
+    response = _bulk_response(bulk_update(db, request.tasks))
+    logger.info(f"Bulk updated {response.succeeded} tasks, {response.failed} failed")
+    return response
+
+
+@router.delete("/bulk", response_model=BulkResponse)
+def delete_tasks_bulk(request: TaskBulkDelete, db: Session = Depends(get_db)):
+    """
+    Delete up to 10,000 tasks by id in one transaction.
+    
+    Ids that don't exist are reported as not_found.
+    """
+    logger.info(f"Bulk deleting {len(request.ids)} tasks")
+    response = _bulk_response(bulk_delete(db, request.ids))
+    logger.info(f"Bulk deleted {response.succeeded} tasks, {response.failed} failed")
+    return response
 
 
 @router.get("/{task_id}", response_model=TaskResponse)
@@ -120,22 +227,67 @@ def update_task(task_id: int, task_data: TaskUpdate, db: Session = Depends(get_d
     """
     logger.info(f"Updating task with id={task_id}")
     
-    task = db.query(Task).filter(Task.id == task_id).first()
+    # Update only provided fields
+    update_data = column_values(task_data.model_dump(exclude_unset=True))
+    nulls = null_required_fields(update_data)
+    if nulls:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+            detail=f"{nulls[0]} cannot be null"
+        )
+    
+    conn = db.connection()
+    if not update_data:
+        # Nothing to change - don't touch updated_at or pending enrichment
+        task = conn.execute(select(tasks_table).where(tasks_table.c.id == task_id)).first()
+        if not task:
+            logger.warning(f"Task with id={task_id} not found")
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Task with id {task_id} not found"
+            )
+        return task
+    
+    if "category" in update_data:
+        update_data["category_source"] = CategorySource.USER.value
+    
+    old = None
+    if update_data.keys() & {"title", "description", "category"}:
+        # The classifier needs the example being replaced; completing a task
+        # or changing its priority/due date skips this read
+        old = conn.execute(
+            select(tasks_table.c.title, tasks_table.c.description, tasks_table.c.category, tasks_table.c.category_source)
+            .where(tasks_table.c.id == task_id)
+        ).first()
+    
+    # One UPDATE ... RETURNING; no row back means no such task. A user edit
+    # supersedes pending background AI enrichment.
+    stmt = (
+        update(tasks_table)
+        .where(tasks_table.c.id == task_id)
+        .values(**update_data, enrichment_status=SKIP_PENDING_ENRICHMENT)
+    )
+    if conn.dialect.update_returning:
+        task = conn.execute(stmt.returning(*tasks_table.c)).first()
+    else:
+        updated = conn.execute(stmt).rowcount
+        task = conn.execute(select(tasks_table).where(tasks_table.c.id == task_id)).first() if updated else None
     
     if not task:
+        db.rollback()
         logger.warning(f"Task with id={task_id} not found")
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Task with id {task_id} not found"
         )
     
-    # Update only provided fields
-    update_data = task_data.model_dump(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(task, field, value)
-    
     db.commit()
-    db.refresh(task)
+    
+    if old:
+        category_classifier.relabel(
+            user_example(*old),
+            user_example(task.title, task.description, task.category, task.category_source)
+        )
     
     logger.info(f"Updated task with id={task_id}")
     return task
@@ -150,17 +302,27 @@ def delete_task(task_id: int, db: Session = Depends(get_db)):
     """
     logger.info(f"Deleting task with id={task_id}")
     
-    task = db.query(Task).filter(Task.id == task_id).first()
+    # DELETE ... RETURNING the classifier example; no row back means no such task
+    conn = db.connection()
+    columns = (tasks_table.c.title, tasks_table.c.description, tasks_table.c.category, tasks_table.c.category_source)
+    stmt = delete(tasks_table).where(tasks_table.c.id == task_id)
+    if conn.dialect.delete_returning:
+        example = conn.execute(stmt.returning(*columns)).first()
+    else:
+        example = conn.execute(select(*columns).where(tasks_table.c.id == task_id)).first()
+        if example:
+            conn.execute(stmt)
     
-    if not task:
+    if not example:
         logger.warning(f"Task with id={task_id} not found")
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Task with id {task_id} not found"
         )
     
-    db.delete(task)
     db.commit()
     
+    category_classifier.relabel(user_example(*example), None)
+    
     logger.info(f"Deleted task with id={task_id}")
     return MessageResponse(message=f"Task {task_id} deleted successfully")
@@ -2,7 +2,7 @@
 Pydantic Schemas for Request/Response Validation
 """
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Annotated
 from pydantic import BaseModel, Field, ConfigDict
 from enum import Enum
 
@@ -55,8 +55,10 @@ class TaskResponse(TaskBase):
     completed: bool
     priority: str
     category: str
+    category_source: str = Field("model", description="Who chose the category: user, or model for a classifier/AI guess")
     due_date: Optional[datetime] = None
     ai_generated: bool = False
+    enrichment_status: Optional[str] = Field(None, description="AI enrichment state for write-first tasks: pending, done, failed or skipped (edited by the user first)")
     created_at: datetime
     updated_at: datetime
     
@@ -66,7 +68,45 @@ class TaskResponse(TaskBase):
 class TaskListResponse(BaseModel):
     """Schema for list of tasks response"""
     tasks: List[TaskResponse]
-    total: int
+    total: Optional[int] = Field(None, description="Tasks matching the filter; null when include_total=false")
+    total_exact: Optional[bool] = Field(None, description="False when total is a planner estimate")
+    next_cursor: Optional[str] = Field(None, description="Pass as cursor to get the following (older) page; null on the last page")
+    prev_cursor: Optional[str] = Field(None, description="Pass as cursor to get the preceding (newer) page; null on the first page")
+
+
+class TaskBulkCreate(BaseModel):
+    """Request to create many tasks in one transaction"""
+    tasks: List[TaskCreate] = Field(..., min_length=1, max_length=10000)
+
+
+class TaskBulkUpdateItem(TaskUpdate):
+    """One task of a bulk update: its id and the fields to change"""
+    id: int
+
+
+class TaskBulkUpdate(BaseModel):
+    """Request to update many tasks in one transaction"""
+    tasks: List[TaskBulkUpdateItem] = Field(..., min_length=1, max_length=10000)
+
+
+class TaskBulkDelete(BaseModel):
+    """Request to delete many tasks in one transaction"""
+    ids: List[int] = Field(..., min_length=1, max_length=10000)
+
+
+class BulkItemResult(BaseModel):
+    """Outcome for one item of a bulk request"""
+    index: int = Field(..., description="Position of the item in the request")
+    id: Optional[int] = None
+    status: str = Field(..., description="created, updated, unchanged, deleted, not_found, duplicate or invalid")
+    detail: Optional[str] = None
+
+
+class BulkResponse(BaseModel):
+    """Per-item results of a bulk request, in request order"""
+    results: List[BulkItemResult]
+    succeeded: int
+    failed: int
 
 
 class MessageResponse(BaseModel):
@@ -84,6 +124,7 @@ class HealthResponse(BaseModel):
 class AIParseRequest(BaseModel):
     """Request to parse natural language into a task"""
     text: str = Field(..., min_length=1, description="Natural language task description")
+    use_cache: bool = Field(True, description="Set to false to bypass cached parse results")
 
 
 class AIParseResponse(BaseModel):
@@ -96,15 +137,33 @@ class AIParseResponse(BaseModel):
     confidence: float = Field(..., ge=0, le=1, description="AI confidence score")
 
 
+class AIParseBatchRequest(BaseModel):
+    """Request to parse many natural language texts at once"""
+    texts: List[Annotated[str, Field(min_length=1)]] = Field(
+        ..., min_length=1, max_length=500, description="Natural language task descriptions"
+    )
+    use_cache: bool = Field(True, description="Set to false to bypass cached parse results")
+
+
+class AIParseBatchResponse(BaseModel):
+    """Parse results, one per input text and in input order"""
+    results: List[AIParseResponse]
+
+
 class AIPrioritizeRequest(BaseModel):
     """Request to prioritize tasks"""
-    task_ids: List[int] = Field(..., description="List of task IDs to prioritize")
+    task_ids: List[int] = Field(default_factory=list, description="List of task IDs to prioritize")
+    all_open: bool = Field(False, description="Prioritize all open tasks instead of task_ids")
+    use_ai: bool = Field(True, description="Let the AI re-rank the top tasks and explain the order")
+    offset: int = Field(0, ge=0, description="Skip this many tasks of the ranked result")
+    limit: Optional[int] = Field(None, ge=1, description="Return at most N tasks of the ranked result")
 
 
 class AIPrioritizeResponse(BaseModel):
     """Response with prioritized tasks"""
     prioritized_tasks: List[dict]
     reasoning: str
+    total: Optional[int] = None  # Tasks ranked, before offset/limit
 
 
 class AIInsightsResponse(BaseModel):
@@ -116,3 +175,26 @@ class AIInsightsResponse(BaseModel):
     tasks_by_priority: dict
     ai_summary: str
     ai_tips: List[str]
+
+
+class BackfillRequest(BaseModel):
+    """Request to start a bulk re-categorization job"""
+    category: Category = Field(Category.OTHER, description="Only re-categorize tasks currently in this category")
+    completed: Optional[bool] = Field(None, description="Filter by completion status")
+
+
+class BackfillJobResponse(BaseModel):
+    """Status and progress of a re-categorization job"""
+    id: int
+    status: str
+    category: str
+    completed: Optional[bool] = None
+    total: int
+    processed: int
+    updated: int
+    skipped: int = 0
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    
+    model_config = ConfigDict(from_attributes=True)
@@ -1,47 +1,325 @@
 """
 AI Service using Google Gemini API
 """
+import asyncio
 import json
+import math
 import re
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Any
-
-import google.generativeai as genai
+from typing import Optional, List, Dict, Any, AsyncIterator, Tuple
 
 from app.config import settings
 from app.schemas import Priority, Category
+from app.services.batcher import MicroBatcher
+from app.services.cache import TTLCache
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.services.classifier import category_classifier
+from app.services.hedging import Hedger
+from app.services.json_extract import extract_json
+from app.services.llm_backend import create_backend
+from app.services.rate_limit import DailyQuota, RateLimiter, estimate_tokens
+from app.services.local_parser import parse_task_text
+from app.services.persistent_cache import PersistentCache
+from app.services.prioritizer import explain_ranking, rank_tasks
+from app.services.prompt_budget import PromptMeter, dedupe, fit, truncate
+from app.services.scheduler import AIPriority, AIScheduler, ClassLimits
+from app.services.singleflight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
 
+def parse_due_date(value: Optional[str]) -> Optional[datetime]:
+    """Parse an ISO due date from a parse result, or None if absent/invalid"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
 class AIService:
     """Service for AI-powered task features using Google Gemini"""
     
     def __init__(self):
-        self.model = None
-        self._initialize()
+        # Gemini, or the fake backend for offline load tests (settings.llm_backend)
+        self.backend = create_backend()
+        self.model_name = self.backend.model_name if self.backend else settings.ai_model
+        # Dedicated pool so slow Gemini calls never block the event loop
+        # or starve FastAPI's default threadpool used by sync endpoints
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(settings.ai_max_concurrency, 1),
+            thread_name_prefix="gemini"
+        )
+        self.parse_cache = TTLCache(settings.ai_parse_cache_size, settings.ai_parse_cache_ttl)
+        # Shared across workers and restarts; read through for parse,
+        # categorize and prioritize results
+        self.persistent_cache = PersistentCache(
+            model=self.model_name,
+            ttl_seconds=settings.ai_persistent_cache_ttl,
+            enabled=settings.ai_persistent_cache_enabled
+        )
+        # Identical concurrent parse/categorize requests share one Gemini call
+        self._inflight = SingleFlight()
+        # Concurrent single parses arriving within a short window share one prompt
+        self._parse_batcher = MicroBatcher(
+            self._parse_texts_with_ai,
+            window_ms=settings.ai_microbatch_window_ms,
+            max_size=settings.ai_parse_batch_size
+        )
+        # Stops calling Gemini while it is failing or slow, so requests go
+        # straight to the local fallbacks instead of waiting out timeouts
+        self.breaker = CircuitBreaker(
+            failure_threshold=settings.ai_breaker_failure_threshold,
+            reset_timeout=settings.ai_breaker_reset_timeout,
+            slow_call_threshold=settings.ai_slow_call_threshold
+        )
+        # Client-side limits so bursts queue briefly or shed load instead of
+        # hitting provider 429s, plus a daily budget
+        self.limiter = RateLimiter(
+            requests_per_second=settings.ai_rate_limit_rps,
+            burst=settings.ai_rate_limit_burst,
+            tokens_per_minute=settings.ai_rate_limit_tpm,
+            max_wait=settings.ai_rate_limit_max_wait
+        )
+        self.quota = DailyQuota(
+            max_requests=settings.ai_daily_request_budget,
+            max_tokens=settings.ai_daily_token_budget
+        )
+        # Backup calls for slow parses (latency-sensitive paths only)
+        self._hedger = Hedger(
+            percentile=settings.ai_hedge_percentile,
+            min_delay=settings.ai_hedge_min_delay,
+            budget=settings.ai_hedge_budget
+        )
+        # Estimated prompt sizes per kind of call
+        self.prompts = PromptMeter()
+        # Hands executor slots to interactive calls first, so background
+        # jobs can't starve /ai/parse
+        self.scheduler = self._build_scheduler()
     
-    def _initialize(self):
-        """Initialize the Gemini model"""
-        if settings.gemini_api_key:
-            try:
-                genai.configure(api_key=settings.gemini_api_key)
-                self.model = genai.GenerativeModel('gemini-1.5-flash')
-                logger.info("Gemini AI model initialized successfully")
-            except Exception as e:
-                logger.error(f"Failed to initialize Gemini: {e}")
-                self.model = None
-        else:
-            logger.warning("No Gemini API key configured")
+    @staticmethod
+    def _build_scheduler() -> AIScheduler:
+        capacity = max(settings.ai_max_concurrency, 1)
+        return AIScheduler(capacity, {
+            AIPriority.INTERACTIVE: ClassLimits(
+                round(capacity * settings.ai_share_interactive),
+                settings.ai_queue_limit_interactive,
+                settings.ai_queue_deadline_interactive
+            ),
+            AIPriority.STANDARD: ClassLimits(
+                round(capacity * settings.ai_share_standard),
+                settings.ai_queue_limit_standard,
+                settings.ai_queue_deadline_standard
+            ),
+            AIPriority.BULK: ClassLimits(
+                round(capacity * settings.ai_share_bulk),
+                settings.ai_queue_limit_bulk,
+                settings.ai_queue_deadline_bulk
+            )
+        })
+    
+    def is_configured(self) -> bool:
+        """Check if an LLM backend was set up"""
+        return self.backend is not None
     
     def is_available(self) -> bool:
-        """Check if AI service is available"""
-        return self.model is not None
+        """Check if AI service is available (configured, circuit not open, budget left)"""
+        return self.is_configured() and not self.breaker.is_open() and not self.quota.exhausted()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Breaker, scheduler, cache, coalescing and batching counters for /ai/status"""
+        return {
+            "scheduler": self.scheduler.stats(),
+            "prompts": self.prompts.stats(),
+            "circuit_breaker": self.breaker.stats(),
+            "rate_limit": self.limiter.stats(),
+            "daily_quota": self.quota.stats(),
+            "parse_cache": self.parse_cache.stats(),
+            "persistent_cache": self.persistent_cache.stats(),
+            "coalescing": self._inflight.stats(),
+            "microbatching": self._parse_batcher.stats(),
+            "category_model": category_classifier.stats(),
+            "hedging": self._hedger.stats()
+        }
+    
+    def shutdown(self):
+        """Release the AI worker threads"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+    
+    async def _generate(
+        self,
+        prompt: str,
+        hedged: bool = False,
+        priority: AIPriority = AIPriority.STANDARD,
+        kind: str = "other"
+    ) -> str:
+        """
+        Run a Gemini call and return the response text.
+        
+        hedged=True (interactive paths only) lets a slow call be raced
+        against a second identical one when ai_hedge_enabled is set.
+        priority picks the scheduler class the call queues in; kind labels
+        the prompt size counters.
+        """
+        if hedged and settings.ai_hedge_enabled:
+            return await self._hedger.run(lambda: self._generate_once(prompt, priority, kind))
+        return await self._generate_once(prompt, priority, kind)
     
-    async def parse_natural_language(self, text: str) -> Dict[str, Any]:
+    async def _generate_once(
+        self,
+        prompt: str,
+        priority: AIPriority = AIPriority.STANDARD,
+        kind: str = "other"
+    ) -> str:
         """
-        Parse natural language into structured task data
+        Run a single Gemini call on the AI executor.
+        
+        Raises QuotaExceeded when the daily budget is spent, SchedulerRejected
+        when the priority class queue is full or no slot frees up in time,
+        RateLimitExceeded when rate limit capacity isn't available within
+        ai_rate_limit_max_wait, CircuitOpenError without calling Gemini while
+        the circuit is open, and asyncio.TimeoutError after ai_call_timeout
+        seconds.
+        """
+        tokens = estimate_tokens(prompt)
+        self.quota.consume(tokens)
+        self.prompts.record(kind, tokens)
+        try:
+            await self.scheduler.acquire(priority)
+        except BaseException:
+            self.quota.refund(tokens)
+            raise
+        
+        try:
+            return await self._call_model(prompt, tokens)
+        finally:
+            self.scheduler.release(priority)
+    
+    async def _admit(self, tokens: int):
+        """Wait for rate limit capacity and check the breaker; refunds the quota charge on failure"""
+        try:
+            await self.limiter.acquire(tokens)
+        except BaseException:
+            self.quota.refund(tokens)
+            raise
+        
+        if not self.breaker.allow_request():
+            self.quota.refund(tokens)
+            raise CircuitOpenError("Gemini circuit is open")
+    
+    async def _call_model(self, prompt: str, tokens: int) -> str:
+        """Rate-limited, breaker-guarded Gemini call; the caller holds a scheduler slot"""
+        await self._admit(tokens)
+        
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        try:
+            text = await asyncio.wait_for(
+                loop.run_in_executor(self._executor, self._generate_sync, prompt),
+                timeout=settings.ai_call_timeout
+            )
+        except asyncio.CancelledError:
+            self.breaker.record_cancelled()
+            raise
+        except asyncio.TimeoutError:
+            self.breaker.record_failure()
+            raise asyncio.TimeoutError(f"Gemini call exceeded {settings.ai_call_timeout}s") from None
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        
+        self.breaker.record_success(time.monotonic() - started)
+        return text
+    
+    def _generate_sync(self, prompt: str) -> str:
+        """Blocking LLM call - only ever run on the AI executor"""
+        return self.backend.generate(prompt, settings.ai_call_timeout)
+    
+    async def _generate_stream(
+        self,
+        prompt: str,
+        priority: AIPriority = AIPriority.STANDARD,
+        kind: str = "other"
+    ) -> AsyncIterator[str]:
+        """
+        Stream a Gemini response, yielding text chunks as they arrive.
+        
+        Goes through the same quota, scheduler, rate limit and breaker gates
+        as _generate_once. ai_call_timeout applies to the gap between chunks,
+        and the breaker judges the call by its time to first chunk.
+        """
+        tokens = estimate_tokens(prompt)
+        self.quota.consume(tokens)
+        self.prompts.record(kind, tokens)
+        try:
+            await self.scheduler.acquire(priority)
+        except BaseException:
+            self.quota.refund(tokens)
+            raise
+        
+        try:
+            await self._admit(tokens)
+            
+            loop = asyncio.get_running_loop()
+            queue: asyncio.Queue = asyncio.Queue()
+            stop = threading.Event()
+            emit = lambda item: loop.call_soon_threadsafe(queue.put_nowait, item)
+            loop.run_in_executor(self._executor, self._stream_sync, prompt, emit, stop)
+            
+            started = time.monotonic()
+            first_chunk: Optional[float] = None
+            try:
+                while True:
+                    event, value = await asyncio.wait_for(queue.get(), timeout=settings.ai_call_timeout)
+                    if event == "error":
+                        raise value
+                    if event == "end":
+                        break
+                    if first_chunk is None:
+                        first_chunk = time.monotonic() - started
+                    yield value
+            except (asyncio.CancelledError, GeneratorExit):
+                self.breaker.record_cancelled()
+                raise
+            except asyncio.TimeoutError:
+                self.breaker.record_failure()
+                raise asyncio.TimeoutError(f"Gemini stream stalled for {settings.ai_call_timeout}s") from None
+            except Exception:
+                self.breaker.record_failure()
+                raise
+            finally:
+                stop.set()
+            
+            self.breaker.record_success(first_chunk if first_chunk is not None else time.monotonic() - started)
+        finally:
+            self.scheduler.release(priority)
+    
+    def _stream_sync(self, prompt: str, emit, stop: threading.Event):
+        """Blocking streaming LLM call - only ever run on the AI executor"""
+        try:
+            for chunk in self.backend.stream(prompt, settings.ai_call_timeout):
+                if stop.is_set():
+                    return
+                emit(("chunk", chunk))
+        except Exception as e:
+            emit(("error", e))
+        else:
+            emit(("end", None))
+    
+    async def parse_natural_language(self, text: str, use_cache: bool = True) -> Dict[str, Any]:
+        """
+        Parse natural language into structured task data.
+        
+        The local parser runs first; Gemini is only called when its
+        confidence is below ai_local_parse_threshold. AI results are cached
+        in memory and in the shared database cache, per normalized text and
+        calendar day (relative dates like "tomorrow" depend on it);
+        use_cache=False skips the lookups and refreshes the entries.
         
         Example: "Remind me to call John tomorrow at 3pm" ->
         {
@@ -53,12 +331,181 @@ class AIService:
             "confidence": 0.95
         }
         """
+        local = self._fallback_parse(text)
+        if not self.is_available() or local["confidence"] >= settings.ai_local_parse_threshold:
+            return local
+        
+        try:
+            return await self.parse_with_ai(text, use_cache)
+            
+        except Exception as e:
+            logger.error(f"AI parsing failed: {e}")
+            return local
+    
+    def parse_local(self, text: str) -> Dict[str, Any]:
+        """Deterministic local parse only - never calls Gemini"""
+        return self._fallback_parse(text)
+    
+    async def parse_with_ai(
+        self,
+        text: str,
+        use_cache: bool = True,
+        priority: AIPriority = AIPriority.INTERACTIVE
+    ) -> Dict[str, Any]:
+        """
+        Cached, coalesced Gemini parse with no local shortcut; raises on failure.
+        
+        Interactive parses are micro-batched and hedged; background callers
+        pass a lower priority and get a plain single call.
+        """
+        cache_key = self._parse_cache_key(text)
+        if use_cache:
+            cached = self.parse_cache.get(cache_key)
+            if cached is not None:
+                return dict(cached)
+        
+        parsed = await self._inflight.do(
+            ("parse", cache_key),
+            lambda: self._read_through("parse", cache_key, lambda: self._parse_with_ai(text, priority), use_cache)
+        )
+        self.parse_cache.set(cache_key, parsed)
+        return dict(parsed)
+    
+    async def parse_batch(self, texts: List[str], use_cache: bool = True) -> List[Dict[str, Any]]:
+        """
+        Parse many natural language texts, packing the ones the local parser
+        can't handle confidently into as few Gemini prompts as possible
+        (ai_parse_batch_size texts per prompt).
+        
+        Returns one result per input, in input order.
+        """
         if not self.is_available():
-            return self._fallback_parse(text)
+            return [self._fallback_parse(text) for text in texts]
+        
+        results: List[Optional[Dict[str, Any]]] = [None] * len(texts)
+        
+        # Serve confident local parses and cache hits, and collapse duplicate inputs
+        pending: Dict[str, List[int]] = {}
+        for i, text in enumerate(texts):
+            local = self._fallback_parse(text)
+            if local["confidence"] >= settings.ai_local_parse_threshold:
+                results[i] = local
+                continue
+            
+            cache_key = self._parse_cache_key(text)
+            cached = self.parse_cache.get(cache_key) if use_cache else None
+            if cached is not None:
+                results[i] = dict(cached)
+            else:
+                pending.setdefault(cache_key, []).append(i)
+        
+        # Then the shared cache, in one lookup
+        if use_cache and pending:
+            for cache_key, parsed in (await self.persistent_cache.get_many("parse", pending)).items():
+                self.parse_cache.set(cache_key, parsed)
+                for i in pending.pop(cache_key):
+                    results[i] = dict(parsed)
+        
+        keys = list(pending)
+        size = max(settings.ai_parse_batch_size, 1)
+        chunks = [keys[i:i + size] for i in range(0, len(keys), size)]
+        chunk_results = await asyncio.gather(
+            *[
+                self._parse_texts_with_ai(
+                    [texts[pending[k][0]] for k in chunk], hedged=False, priority=AIPriority.STANDARD
+                )
+                for chunk in chunks
+            ],
+            return_exceptions=True
+        )
+        
+        for chunk, parsed_chunk in zip(chunks, chunk_results):
+            if isinstance(parsed_chunk, Exception):
+                logger.error(f"AI batch parsing failed: {parsed_chunk}")
+                parsed_chunk = [None] * len(chunk)
+            
+            for cache_key, parsed in zip(chunk, parsed_chunk):
+                if parsed is not None:
+                    self.parse_cache.set(cache_key, parsed)
+                    await self.persistent_cache.set("parse", cache_key, parsed)
+                for i in pending[cache_key]:
+                    results[i] = dict(parsed) if parsed is not None else self._fallback_parse(texts[i])
+        
+        return results
+    
+    async def _parse_with_ai(self, text: str, priority: AIPriority = AIPriority.INTERACTIVE) -> Dict[str, Any]:
+        """Parse one text with Gemini, micro-batched with concurrent interactive callers; raises on failure"""
+        if priority != AIPriority.INTERACTIVE:
+            parsed = (await self._parse_texts_with_ai([text], hedged=False, priority=priority))[0]
+        elif settings.ai_microbatch_window_ms > 0:
+            parsed = await self._parse_batcher.submit(text)
+        else:
+            parsed = (await self._parse_texts_with_ai([text]))[0]
+        
+        if parsed is None:
+            raise ValueError("No parse result returned for input")
+        return parsed
+    
+    async def _parse_texts_with_ai(
+        self,
+        texts: List[str],
+        hedged: bool = True,
+        priority: AIPriority = AIPriority.INTERACTIVE
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        Parse texts with a single Gemini call; raises on failure.
+        
+        Items missing from a multi-item response come back as None. Bulk
+        callers pass hedged=False and a lower priority.
+        """
+        if len(texts) == 1:
+            return [await self._parse_single_with_ai(texts[0], hedged, priority)]
+        
+        inputs = "\n".join(
+            f"{i}: {json.dumps(truncate(text, settings.ai_prompt_input_tokens))}" for i, text in enumerate(texts)
+        )
+        prompt = f"""Parse each of these natural language task descriptions into structured JSON.
+
+Inputs:
+{inputs}
+
+For each input extract:
+1. title: A clear, concise task title (max 50 chars)
+2. description: Additional details (optional, can be null)
+3. priority: One of [low, medium, high, urgent] based on urgency words
+4. category: One of [work, personal, health, finance, learning, errands, other]
+5. due_date: ISO format datetime if mentioned (relative to today: {datetime.now().strftime('%Y-%m-%d')}), or null
+6. confidence: Your confidence score 0.0-1.0
+
+Respond ONLY with valid JSON, no other text, with one entry per input:
+{{"results": [{{"index": 0, "title": "...", "description": "...", "priority": "...", "category": "...", "due_date": "...", "confidence": 0.0}}]}}"""
+
+        response_text = await self._generate(prompt, hedged=hedged, priority=priority, kind="parse_batch")
+        items = self._extract_json(response_text, {"results": list}).get("results", [])
         
+        results: List[Optional[Dict[str, Any]]] = [None] * len(texts)
+        for position, item in enumerate(items if isinstance(items, list) else []):
+            if not isinstance(item, dict):
+                continue
+            index = item.get("index", position)
+            if isinstance(index, int) and 0 <= index < len(texts) and results[index] is None:
+                try:
+                    results[index] = self._validate_parsed_task(item)
+                except ValueError as e:
+                    # Leave just this input to the local fallback
+                    logger.warning(f"Malformed AI parse item {index}: {e}")
+        return results
+    
+    async def _parse_single_with_ai(
+        self,
+        text: str,
+        hedged: bool = True,
+        priority: AIPriority = AIPriority.INTERACTIVE
+    ) -> Dict[str, Any]:
+        """Single-input Gemini parse call; raises on failure"""
         prompt = f"""Parse this natural language task description into structured JSON.
 
-Input: "{text}"
+Input: "{truncate(text, settings.ai_prompt_input_tokens)}"
 
 Extract:
 1. title: A clear, concise task title (max 50 chars)
@@ -71,100 +518,346 @@ Extract:
 Respond ONLY with valid JSON, no other text:
 {{"title": "...", "description": "...", "priority": "...", "category": "...", "due_date": "...", "confidence": 0.0}}"""
 
+        response_text = await self._generate(prompt, hedged=hedged, priority=priority, kind="parse")
+        result = self._extract_json(response_text, {"title": str})
+        if not result:
+            raise ValueError("No task in AI response")
+        
+        # Validate and normalize
+        return self._validate_parsed_task(result)
+    
+    async def prioritize_tasks(
+        self,
+        tasks: List[Dict],
+        use_ai: bool = True,
+        limit: Optional[int] = None,
+        offset: int = 0
+    ) -> Dict[str, Any]:
+        """
+        Prioritize tasks with the local scoring engine.
+        
+        The AI only re-ranks the top ai_rerank_top_k tasks and explains the
+        order; everything below keeps its local rank. offset/limit page
+        through the ranked result.
+        """
+        ranked = self._rank_locally(tasks, limit, offset)
+        head, tail = ranked[:settings.ai_rerank_top_k], ranked[settings.ai_rerank_top_k:]
+        page = lambda ordered: ordered[offset:offset + limit] if limit else ordered[offset:]
+        if not use_ai or not self.is_available() or len(head) < 2:
+            return {"prioritized_tasks": page(ranked), "reasoning": explain_ranking(ranked)}
+        
         try:
-            response = self.model.generate_content(prompt)
-            result = self._extract_json(response.text)
-            
-            # Validate and normalize
-            return self._validate_parsed_task(result)
+            reranked, reasoning = await self._rank_with_ai(head)
+            return {"prioritized_tasks": page(reranked + tail), "reasoning": reasoning}
             
         except Exception as e:
-            logger.error(f"AI parsing failed: {e}")
-            return self._fallback_parse(text)
+            logger.error(f"AI prioritization failed: {e}")
+            return {"prioritized_tasks": page(ranked), "reasoning": explain_ranking(ranked)}
     
-    async def prioritize_tasks(self, tasks: List[Dict]) -> Dict[str, Any]:
+    async def stream_prioritization(
+        self,
+        tasks: List[Dict],
+        use_ai: bool = True,
+        limit: Optional[int] = None,
+        offset: int = 0
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
         """
-        AI-powered task prioritization
+        Prioritize tasks, yielding (event, data) pairs for a streaming response.
+        
+        The local ranking comes first ("order"), then the AI reasoning for
+        re-ranking the top slice as it is generated ("token"), then the final
+        order and reasoning ("result"). Errors end the stream with the local
+        ranking. A top slice too large for one prompt is ranked as a
+        tournament and only its result is sent.
         """
-        if not self.is_available() or not tasks:
-            return {"prioritized_tasks": tasks, "reasoning": "AI unavailable - using default order"}
+        ranked = self._rank_locally(tasks, limit, offset)
+        page = lambda ordered: ordered[offset:offset + limit] if limit else ordered[offset:]
+        local = {"prioritized_tasks": page(ranked), "reasoning": explain_ranking(ranked)}
+        yield "order", local
         
-        tasks_text = "\n".join([
-            f"- ID {t['id']}: {t['title']} (due: {t.get('due_date', 'none')}, category: {t.get('category', 'other')})"
-            for t in tasks
-        ])
+        head, tail = ranked[:settings.ai_rerank_top_k], ranked[settings.ai_rerank_top_k:]
+        if not use_ai or not self.is_available() or len(head) < 2:
+            yield "result", local
+            return
         
-        prompt = f"""Prioritize these tasks and explain why:
+        groups = dedupe(head, key=lambda t: t["title"])
+        representatives = [task for task, _ in groups]
+        if len(representatives) < 2 or len(self._prioritize_chunks(representatives)) > 1:
+            try:
+                reranked, reasoning = await self._rank_with_ai(head)
+                yield "result", {"prioritized_tasks": page(reranked + tail), "reasoning": reasoning}
+            except Exception as e:
+                logger.error(f"AI prioritization failed: {e}")
+                yield "result", local
+            return
+        
+        prompt = f"""These tasks are ranked by a local urgency score. Re-rank them if
+something else matters more and explain why:
 
-{tasks_text}
+{self._prioritize_lines(representatives)}
 
 Consider:
 1. Due dates (urgent first)
 2. Category importance
 3. Task complexity
 
-Respond with JSON:
-{{"order": [id1, id2, ...], "reasoning": "brief explanation"}}"""
+First explain your reasoning briefly in plain text. Then, on the last line,
+write ORDER: followed by the task IDs, most important first, comma-separated."""
 
+        chunks = []
         try:
-            response = self.model.generate_content(prompt)
-            result = self._extract_json(response.text)
-            
-            # Reorder tasks based on AI suggestion
-            order = result.get("order", [t["id"] for t in tasks])
-            task_map = {t["id"]: t for t in tasks}
-            prioritized = [task_map[tid] for tid in order if tid in task_map]
-            
-            return {
-                "prioritized_tasks": prioritized,
-                "reasoning": result.get("reasoning", "Prioritized by AI")
-            }
-            
+            async for text in self._generate_stream(prompt, kind="prioritize"):
+                chunks.append(text)
+                yield "token", {"text": text}
         except Exception as e:
-            logger.error(f"AI prioritization failed: {e}")
-            return {"prioritized_tasks": tasks, "reasoning": f"Error: {str(e)}"}
+            logger.error(f"AI prioritization stream failed: {e}")
+            yield "result", local
+            return
+        
+        reasoning, marker, order_text = "".join(chunks).rpartition("ORDER:")
+        order = [int(tid) for tid in re.findall(r"\d+", order_text)]
+        if not marker or not order:
+            yield "result", local
+            return
+        
+        yield "result", {
+            "prioritized_tasks": page(self._with_duplicates(self._apply_rerank(representatives, order), groups) + tail),
+            "reasoning": reasoning.strip() or "Prioritized by AI"
+        }
     
-    async def categorize_task(self, title: str, description: str = "") -> str:
-        """Auto-categorize a task"""
-        if not self.is_available():
-            return Category.OTHER.value
+    def _rank_locally(self, tasks: List[Dict], limit: Optional[int], offset: int) -> List[Dict]:
+        """Local ranking, deep enough for the requested page and the AI re-rank slice"""
+        depth = max(offset + limit, settings.ai_rerank_top_k) if limit else None
+        return rank_tasks(tasks, depth)
+    
+    async def _rank_with_ai(self, tasks: List[Dict]) -> Tuple[List[Dict], str]:
+        """
+        AI order and reasoning for locally ranked tasks; raises on failure.
         
-        prompt = f"""Categorize this task into one of: work, personal, health, finance, learning, errands, other
+        Tasks with near-identical titles are ranked once and their duplicates
+        follow them.
+        """
+        groups = dedupe(tasks, key=lambda t: t["title"])
+        if len(groups) < 2:
+            return tasks, explain_ranking(tasks)
+        
+        ordered, reasoning = await self._rank_tournament([task for task, _ in groups])
+        return self._with_duplicates(ordered, groups), reasoning
+    
+    def _with_duplicates(self, ordered: List[Dict], groups: List[Tuple[Dict, List[Dict]]]) -> List[Dict]:
+        """Expand ranked representatives with their near-duplicate tasks"""
+        similar = {task["id"]: duplicates for task, duplicates in groups}
+        return [t for task in ordered for t in (task, *similar[task["id"]])]
+    
+    async def _rank_tournament(self, tasks: List[Dict]) -> Tuple[List[Dict], str]:
+        """
+        AI order and reasoning for locally ranked tasks; raises on failure.
+        
+        Tasks that don't fit one prompt are ranked as a tournament: chunks
+        are ranked concurrently (ai_prioritize_parallelism at a time), the
+        top of each chunk advances to the next round until the finalists fit
+        one prompt, and everyone else is merged by their relative rank within
+        their chunk. A failed chunk keeps its local order.
+        """
+        chunks = self._prioritize_chunks(tasks)
+        if len(chunks) == 1:
+            result = await self._rank_chunk(tasks)
+            return self._apply_rerank(tasks, result["order"]), result["reasoning"]
+        
+        semaphore = asyncio.Semaphore(max(settings.ai_prioritize_parallelism, 1))
+        
+        async def rank(chunk: List[Dict]) -> List[Dict]:
+            async with semaphore:
+                try:
+                    return self._apply_rerank(chunk, (await self._rank_chunk(chunk))["order"])
+                except Exception as e:
+                    logger.error(f"AI prioritization of a chunk failed: {e}")
+                    return chunk
+        
+        ranked_chunks = await asyncio.gather(*[rank(chunk) for chunk in chunks])
+        
+        # Every chunk has at least two tasks, so each round strictly shrinks
+        seed = {t["id"]: i for i, t in enumerate(tasks)}
+        advance = max(min(settings.ai_prioritize_chunk_size // len(chunks), min(map(len, chunks)) - 1), 1)
+        finalists, rest = [], []
+        for ranked_chunk in ranked_chunks:
+            finalists += ranked_chunk[:advance]
+            rest += [
+                (position / len(ranked_chunk), seed[t["id"]], t)
+                for position, t in enumerate(ranked_chunk[advance:], start=advance)
+            ]
+        
+        finalists.sort(key=lambda t: seed[t["id"]])
+        ordered, reasoning = await self._rank_tournament(finalists)
+        rest.sort(key=lambda item: item[:2])
+        return ordered + [t for _, _, t in rest], reasoning
+    
+    def _prioritize_chunks(self, tasks: List[Dict]) -> List[List[Dict]]:
+        """
+        Split locally ranked tasks into prompts of at most ai_prioritize_chunk_size
+        tasks and about ai_prioritize_chunk_tokens tokens each.
+        
+        Snake seeding spreads the strongest tasks evenly across the chunks.
+        """
+        tokens = sum(estimate_tokens(self._prioritize_lines([t])) for t in tasks)
+        count = max(
+            math.ceil(tokens / max(settings.ai_prioritize_chunk_tokens, 1)),
+            math.ceil(len(tasks) / max(settings.ai_prioritize_chunk_size, 2))
+        )
+        count = min(count, len(tasks) // 2)
+        if count <= 1:
+            return [tasks]
+        
+        chunks: List[List[Dict]] = [[] for _ in range(count)]
+        for i, task in enumerate(tasks):
+            lap, position = divmod(i, count)
+            chunks[position if lap % 2 == 0 else count - 1 - position].append(task)
+        return chunks
+    
+    async def _rank_chunk(self, tasks: List[Dict]) -> Dict[str, Any]:
+        """Cached Gemini ranking of one prompt's worth of tasks; raises on failure"""
+        prompt = f"""These tasks are ranked by a local urgency score. Re-rank them if
+something else matters more and explain why:
 
-Task: {title}
-{f'Description: {description}' if description else ''}
+{self._prioritize_lines(tasks)}
 
-Respond with just the category word, nothing else."""
+Consider:
+1. Due dates (urgent first)
+2. Category importance
+3. Task complexity
 
-        try:
-            response = self.model.generate_content(prompt)
-            category = response.text.strip().lower()
-            
-            # Validate category
-            valid_categories = [c.value for c in Category]
-            if category in valid_categories:
-                return category
+Respond with JSON:
+{{"order": [id1, id2, ...], "reasoning": "brief explanation"}}"""
+
+        # Same tasks on the same day -> same answer, across workers
+        cache_key = f"{datetime.now().strftime('%Y-%m-%d')}|{prompt}"
+        return await self._read_through("prioritize", cache_key, lambda: self._prioritize_with_ai(prompt))
+    
+    def _prioritize_lines(self, tasks: List[Dict]) -> str:
+        """One prompt line per task for the prioritization prompts"""
+        return "\n".join([
+            f"- ID {t['id']}: {truncate(t['title'], settings.ai_prompt_field_tokens)} (priority: {t.get('priority', 'medium')}, "
+            f"due: {t.get('due_date') or 'none'}, category: {t.get('category', 'other')})"
+            for t in tasks
+        ])
+    
+    def _apply_rerank(self, head: List[Dict], order: List[Any]) -> List[Dict]:
+        """Reorder head by the AI's id order; ids it left out keep their local rank after it"""
+        task_map = {t["id"]: t for t in head}
+        reranked = [task_map.pop(tid) for tid in order if isinstance(tid, int) and tid in task_map]
+        return reranked + [t for t in head if t["id"] in task_map]
+    
+    async def _prioritize_with_ai(self, prompt: str) -> Dict[str, Any]:
+        """Single Gemini prioritization call; raises unless an order comes back"""
+        response_text = await self._generate(prompt, kind="prioritize")
+        result = self._extract_json(response_text, {"order": list})
+        
+        if not result:
+            raise ValueError("No task order in AI response")
+        return {"order": result["order"], "reasoning": result.get("reasoning", "Prioritized by AI")}
+    
+    async def categorize_task(self, title: str, description: str = "") -> str:
+        """Auto-categorize a task, using Gemini only when the local classifier is unsure"""
+        category = self.local_category(title, description)
+        if category:
+            return category
+        
+        if not self.is_available():
             return Category.OTHER.value
+        
+        cache_key = f"{' '.join(title.lower().split())}|{' '.join(description.lower().split())}"
+        try:
+            return await self._inflight.do(
+                ("categorize", cache_key),
+                lambda: self._read_through("categorize", cache_key, lambda: self._categorize_with_ai(title, description))
+            )
             
         except Exception as e:
             logger.error(f"AI categorization failed: {e}")
             return Category.OTHER.value
     
+    async def _categorize_with_ai(self, title: str, description: str) -> str:
+        """Single Gemini categorize call; raises on failure"""
+        prompt = f"""Categorize this task into one of: work, personal, health, finance, learning, errands, other
+
+Task: {truncate(title, settings.ai_prompt_field_tokens)}
+{f'Description: {truncate(description, settings.ai_prompt_field_tokens)}' if description else ''}
+
+Respond with just the category word, nothing else."""
+
+        response_text = await self._generate(prompt, kind="categorize")
+        category = response_text.strip().lower()
+        
+        # Validate category
+        valid_categories = [c.value for c in Category]
+        if category in valid_categories:
+            return category
+        return Category.OTHER.value
+    
+    async def categorize_batch(self, tasks: List[Dict], priority: AIPriority = AIPriority.BULK) -> Dict[int, str]:
+        """
+        Categorize many tasks ({"id", "title", "description"}) at once.
+        
+        Tasks the local classifier is confident about never reach Gemini; the
+        rest are sent in a single prompt. Tasks nobody could categorize (AI
+        unavailable or failing, or left out of the answer) are missing from
+        the result rather than defaulted to "other".
+        """
+        results: Dict[int, str] = {}
+        remaining = []
+        for task in tasks:
+            category = self.local_category(task["title"], task.get("description"))
+            if category:
+                results[task["id"]] = category
+            else:
+                remaining.append(task)
+        
+        if remaining and self.is_available():
+            try:
+                results.update(await self._categorize_batch_with_ai(remaining, priority))
+            except Exception as e:
+                logger.error(f"AI batch categorization failed: {e}")
+        
+        return results
+    
+    async def _categorize_batch_with_ai(self, tasks: List[Dict], priority: AIPriority = AIPriority.BULK) -> Dict[int, str]:
+        """Single Gemini call categorizing several tasks; raises on failure"""
+        tasks_text = "\n".join(
+            f"{t['id']}: {json.dumps(truncate(t['title'], settings.ai_prompt_field_tokens))}"
+            + (f" - {json.dumps(truncate(t['description'], settings.ai_prompt_field_tokens))}" if t.get("description") else "")
+            for t in tasks
+        )
+        
+        prompt = f"""Categorize each of these tasks into one of: work, personal, health, finance, learning, errands, other
+
+Tasks (id: title - description):
+{tasks_text}
+
+Respond ONLY with valid JSON mapping each task id to its category, no other text:
+{{"<id>": "<category>", ...}}"""
+
+        response_text = await self._generate(prompt, priority=priority, kind="categorize_batch")
+        result = self._extract_json(response_text)
+        
+        valid_categories = {c.value for c in Category}
+        ids = {t["id"] for t in tasks}
+        categories = {}
+        for key, category in result.items():
+            try:
+                task_id = int(key)
+            except (TypeError, ValueError):
+                continue
+            if task_id in ids and isinstance(category, str) and category.strip().lower() in valid_categories:
+                categories[task_id] = category.strip().lower()
+        return categories
+    
     async def generate_insights(self, tasks: List[Dict], stats: Dict) -> Dict[str, Any]:
         """Generate AI-powered productivity insights"""
         if not self.is_available():
             return self._fallback_insights(stats)
         
         # Prepare context
-        tasks_summary = f"""
-Total tasks: {stats['total']}
-Completed: {stats['completed']}
-Completion rate: {stats['completion_rate']:.1%}
-By category: {stats['by_category']}
-By priority: {stats['by_priority']}
-
-Recent tasks: {[t['title'] for t in tasks[:5]]}
-"""
+        tasks_summary = self._insights_context(tasks, stats)
         
         prompt = f"""You are a productivity coach. Based on this task data, provide:
 
@@ -177,8 +870,10 @@ Respond with JSON:
 {{"summary": "...", "tips": ["tip1", "tip2", "tip3"]}}"""
 
         try:
-            response = self.model.generate_content(prompt)
-            result = self._extract_json(response.text)
+            response_text = await self._generate(prompt, kind="insights")
+            result = self._extract_json(response_text, {"summary": str})
+            if not result:
+                raise ValueError("No summary in AI response")
             
             return {
                 "ai_summary": result.get("summary", "Keep up the good work!"),
@@ -189,52 +884,126 @@ Respond with JSON:
             logger.error(f"AI insights failed: {e}")
             return self._fallback_insights(stats)
     
-    def _extract_json(self, text: str) -> Dict:
-        """Extract JSON from AI response"""
-        # Try to find JSON in the response
-        text = text.strip()
+    async def stream_insights(self, tasks: List[Dict], stats: Dict) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Generate insights, yielding (event, data) pairs for a streaming response.
         
-        # Remove markdown code blocks if present
-        if text.startswith("```"):
-            text = re.sub(r'^```\w*\n?', '', text)
-            text = re.sub(r'\n?```$', '', text)
+        Summary and tips text is yielded as it is generated ("token"), then
+        the parsed result ("insights"). Errors end the stream with the
+        fallback insights.
+        """
+        if not self.is_available():
+            yield "insights", self._fallback_insights(stats)
+            return
         
+        prompt = f"""You are a productivity coach. Based on this task data:
+
+{self._insights_context(tasks, stats)}
+
+Write a brief summary (2-3 sentences), then 3 specific tips to improve
+productivity, one per line, each starting with "- ". Plain text only."""
+
+        chunks = []
         try:
-            return json.loads(text)
-        except json.JSONDecodeError:
-            # Try to find JSON object in text
-            match = re.search(r'\{[^{}]*\}', text, re.DOTALL)
-            if match:
-                try:
-                    return json.loads(match.group())
-                except:
-                    pass
-            return {}
+            async for text in self._generate_stream(prompt, kind="insights"):
+                chunks.append(text)
+                yield "token", {"text": text}
+        except Exception as e:
+            logger.error(f"AI insights stream failed: {e}")
+            yield "insights", self._fallback_insights(stats)
+            return
+        
+        summary, tips = [], []
+        for line in "".join(chunks).splitlines():
+            line = line.strip()
+            if line.startswith(("- ", "* ")):
+                tips.append(line[2:].strip())
+            elif line and not tips:
+                summary.append(line)
+        
+        yield "insights", {
+            "ai_summary": " ".join(summary) or "Keep up the good work!",
+            "ai_tips": tips[:3] or ["Stay focused", "Prioritize important tasks", "Take breaks"]
+        }
+    
+    def _insights_context(self, tasks: List[Dict], stats: Dict) -> str:
+        """
+        Task statistics block shared by the insights prompts.
+        
+        Recent tasks are deduplicated, the most pressing open ones come
+        first, and the list is cut to ai_insights_context_tokens.
+        """
+        open_tasks = rank_tasks([t for t in tasks if not t.get("completed")])
+        done_tasks = [t for t in tasks if t.get("completed")]
+        titles = [
+            json.dumps(truncate(task["title"], settings.ai_prompt_field_tokens))
+            + (f" (x{len(duplicates) + 1})" if duplicates else "")
+            + (" [done]" if task.get("completed") else "")
+            for task, duplicates in dedupe(open_tasks + done_tasks, key=lambda t: t["title"])
+        ]
+        recent = ", ".join(fit(titles, settings.ai_insights_context_tokens))
+        
+        return f"""
+Total tasks: {stats['total']}
+Completed: {stats['completed']}
+Completion rate: {stats['completion_rate']:.1%}
+By category: {stats['by_category']}
+By priority: {stats['by_priority']}
+
+Recent tasks: [{recent}]
+"""
+    
+    async def _read_through(self, namespace: str, key: str, compute, use_cache: bool = True) -> Any:
+        """Serve from the persistent cache, or compute and store the result"""
+        if use_cache:
+            cached = await self.persistent_cache.get(namespace, key)
+            if cached is not None:
+                return cached
+        
+        value = await compute()
+        await self.persistent_cache.set(namespace, key, value)
+        return value
+    
+    def _parse_cache_key(self, text: str) -> str:
+        """Cache key for a parse: today's date plus case/whitespace-normalized text"""
+        normalized = " ".join(text.lower().split())
+        return f"{datetime.now().strftime('%Y-%m-%d')}|{normalized}"
+    
+    def _extract_json(self, text: str, required: Optional[Dict[str, Any]] = None) -> Dict:
+        """Extract the JSON object from an AI response ({} if there is none matching required)"""
+        return extract_json(text, required)
     
     def _validate_parsed_task(self, data: Dict) -> Dict[str, Any]:
-        """Validate and normalize parsed task data"""
+        """Validate and normalize parsed task data; ValueError when there is no usable title"""
         valid_priorities = [p.value for p in Priority]
         valid_categories = [c.value for c in Category]
         
+        title = data.get("title", "New Task")
+        if not isinstance(title, str) or not title.strip():
+            raise ValueError(f"Invalid title: {title!r}")
+        description = data.get("description")
+        due_date = data.get("due_date")
+        confidence = data.get("confidence", 0.5)
+        if isinstance(confidence, bool) or not isinstance(confidence, (int, float)) or math.isnan(confidence):
+            confidence = 0.5
+        
         return {
-            "title": data.get("title", "New Task")[:255],
-            "description": data.get("description"),
+            "title": title[:255],
+            "description": description if isinstance(description, str) else None,
             "priority": data.get("priority", "medium") if data.get("priority") in valid_priorities else "medium",
             "category": data.get("category", "other") if data.get("category") in valid_categories else "other",
-            "due_date": data.get("due_date"),
-            "confidence": min(max(float(data.get("confidence", 0.5)), 0), 1)
+            "due_date": due_date if isinstance(due_date, str) else None,
+            "confidence": min(max(float(confidence), 0), 1)
         }
     
+    def local_category(self, title: str, description: Optional[str] = None) -> Optional[str]:
+        """Category from the local classifier, or None when it isn't confident"""
+        category, confidence = category_classifier.predict(title, description)
+        return category if confidence >= settings.ai_classifier_threshold else None
+    
     def _fallback_parse(self, text: str) -> Dict[str, Any]:
-        """Fallback parsing when AI is unavailable"""
-        return {
-            "title": text[:100],
-            "description": None,
-            "priority": Priority.MEDIUM.value,
-            "category": Category.OTHER.value,
-            "due_date": None,
-            "confidence": 0.5
-        }
+        """Deterministic local parse - the fast path, and the fallback when AI is unavailable"""
+        return parse_task_text(text, classify=self.local_category)
     
     def _fallback_insights(self, stats: Dict) -> Dict[str, Any]:
         """Fallback insights when AI is unavailable"""
@@ -0,0 +1,349 @@
+"""
+Background bulk re-categorization of existing tasks
+"""
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import or_, update
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models import BackfillJob, CategorySource, Task
+from app.services.ai_service import ai_service
+from app.services.classifier import category_classifier, user_example
+
+logger = logging.getLogger(__name__)
+
+# A running job whose heartbeat is older than this is considered orphaned
+STALE_AFTER = timedelta(minutes=2)
+HEARTBEAT_INTERVAL = STALE_AFTER / 4
+
+
+class BackfillRunner:
+    """
+    Runs re-categorization jobs as asyncio tasks.
+
+    Jobs walk the matching tasks in id order, page by page. Each page is
+    split into prompts of backfill_batch_size tasks, at most
+    backfill_concurrency of them in flight, and the results are written with
+    one bulk UPDATE together with the job's checkpoint. A job interrupted by
+    a restart is picked up again from its last checkpoint.
+
+    Tasks the AI could not categorize (unavailable, over quota, failed
+    prompt) are left alone: the checkpoint stops short of the first of
+    them and the page is retried with exponential backoff. After
+    backfill_max_attempts tries at the same task, tasks the AI keeps
+    leaving out are skipped (and counted), while an AI that is still
+    unavailable (breaker open, quota spent) fails the job.
+
+    Each claim carries a token; the heartbeat is refreshed in the background
+    while the job runs, and the checkpoint only writes while the token is
+    still the job's, so a job taken over by another worker stops here.
+    """
+
+    def __init__(self):
+        self._running: Dict[int, asyncio.Task] = {}
+        self._claims: Dict[int, str] = {}
+        self._watcher: Optional[asyncio.Task] = None
+
+    def start(self, job_id: int):
+        """Run a job in the background if it isn't already running here"""
+        if job_id in self._running:
+            return
+        task = asyncio.create_task(self._run(job_id))
+        self._running[job_id] = task
+        task.add_done_callback(lambda _: self._running.pop(job_id, None))
+
+    def watch(self):
+        """Periodically pick up unfinished jobs (after restarts or from dead workers)"""
+        if self._watcher is None:
+            self._watcher = asyncio.create_task(self._watch())
+
+    async def _watch(self):
+        while True:
+            try:
+                for job_id in await asyncio.to_thread(self._find_resumable):
+                    if job_id not in self._running:
+                        self.start(job_id)
+            except Exception as e:
+                logger.error(f"Backfill watcher failed: {e}")
+            await asyncio.sleep(STALE_AFTER.total_seconds() / 2)
+
+    async def stop(self):
+        """Stop local jobs and release them so they resume from their checkpoint"""
+        if self._watcher is not None:
+            self._watcher.cancel()
+            self._watcher = None
+
+        claims = dict(self._claims)
+        tasks = list(self._running.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if claims:
+            await asyncio.to_thread(self._release, claims)
+
+    async def _run(self, job_id: int):
+        token = uuid.uuid4().hex
+        if not await asyncio.to_thread(self._claim, job_id, token):
+            return
+        logger.info(f"Running backfill job {job_id}")
+
+        self._claims[job_id] = token
+        heartbeat = asyncio.create_task(self._heartbeat(job_id, token, asyncio.current_task()))
+        delay = settings.backfill_retry_delay
+        stuck_at, attempts = None, 0
+        try:
+            if not ai_service.is_configured():
+                raise RuntimeError("AI is not configured")
+
+            while True:
+                job = await asyncio.to_thread(self._load_job, job_id)
+                if job is None or job.status != "running" or job.claim_token != token:
+                    return
+
+                page = await asyncio.to_thread(self._load_page, job)
+                if not page:
+                    await asyncio.to_thread(self._finish, job_id, token, "completed")
+                    logger.info(f"Backfill job {job_id} completed")
+                    return
+
+                categories = await self._categorize_page(page)
+                missing = [task["id"] for task in page if task["id"] not in categories]
+                if missing:
+                    attempts = attempts + 1 if missing[0] == stuck_at else 1
+                    stuck_at = missing[0]
+                give_up = bool(missing) and attempts >= settings.backfill_max_attempts
+                if give_up and not ai_service.is_available():
+                    raise RuntimeError(f"AI unavailable after {attempts} attempts at the same page")
+
+                if not await asyncio.to_thread(self._checkpoint, job_id, token, page, categories, give_up):
+                    logger.warning(f"Backfill job {job_id} is no longer ours, stopping")
+                    return
+
+                if give_up:
+                    logger.warning(f"Backfill job {job_id}: skipped {len(missing)} tasks the AI kept leaving out")
+                    stuck_at, attempts = None, 0
+                    delay = settings.backfill_retry_delay
+                elif missing:
+                    logger.warning(
+                        f"Backfill job {job_id}: {len(missing)} tasks not categorized, "
+                        f"retrying in {delay:.0f}s (attempt {attempts})"
+                    )
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, settings.backfill_retry_max_delay)
+                else:
+                    delay = settings.backfill_retry_delay
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Backfill job {job_id} failed: {e}")
+            await asyncio.to_thread(self._finish, job_id, token, "failed", str(e))
+        finally:
+            heartbeat.cancel()
+            self._claims.pop(job_id, None)
+
+    async def _heartbeat(self, job_id: int, token: str, run: asyncio.Task):
+        """Keep the claim fresh while pages wait on the AI; stop the run if the claim is lost"""
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL.total_seconds())
+            try:
+                held = await asyncio.to_thread(self._beat, job_id, token)
+            except Exception as e:
+                logger.error(f"Backfill heartbeat for job {job_id} failed: {e}")
+                continue
+            if not held:
+                logger.warning(f"Backfill job {job_id} lost its claim, stopping")
+                run.cancel()
+                return
+
+    async def _categorize_page(self, page: List[Dict]) -> Dict[int, str]:
+        """
+        Categorize a page of tasks with bounded concurrent batch prompts;
+        tasks the AI could not categorize are missing from the result
+        """
+        size = max(settings.backfill_batch_size, 1)
+        batches = [page[i:i + size] for i in range(0, len(page), size)]
+
+        categories: Dict[int, str] = {}
+        for result in await asyncio.gather(*[ai_service.categorize_batch(batch) for batch in batches]):
+            categories.update(result)
+        return categories
+
+    # Database work - run off the event loop via asyncio.to_thread
+
+    def _find_resumable(self) -> List[int]:
+        db = SessionLocal()
+        try:
+            rows = (
+                db.query(BackfillJob.id)
+                .filter(BackfillJob.status.in_(["pending", "running"]))
+                .all()
+            )
+            return [row.id for row in rows]
+        finally:
+            db.close()
+
+    def _claim(self, job_id: int, token: str) -> bool:
+        """Atomically take ownership of a pending or orphaned job"""
+        now = datetime.utcnow()
+        db = SessionLocal()
+        try:
+            result = db.execute(
+                update(BackfillJob)
+                .where(
+                    BackfillJob.id == job_id,
+                    BackfillJob.status.in_(["pending", "running"]),
+                    or_(BackfillJob.heartbeat_at.is_(None), BackfillJob.heartbeat_at < now - STALE_AFTER)
+                )
+                .values(status="running", heartbeat_at=now, claim_token=token)
+            )
+            db.commit()
+            return result.rowcount == 1
+        finally:
+            db.close()
+
+    def _beat(self, job_id: int, token: str) -> bool:
+        """Refresh the heartbeat; False once the job is finished, cancelled or claimed elsewhere"""
+        db = SessionLocal()
+        try:
+            result = db.execute(
+                update(BackfillJob)
+                .where(BackfillJob.id == job_id, BackfillJob.status == "running", BackfillJob.claim_token == token)
+                .values(heartbeat_at=datetime.utcnow())
+            )
+            db.commit()
+            return result.rowcount == 1
+        finally:
+            db.close()
+
+    def _load_job(self, job_id: int) -> Optional[BackfillJob]:
+        db = SessionLocal()
+        try:
+            job = db.query(BackfillJob).filter(BackfillJob.id == job_id).first()
+            if job is not None:
+                db.expunge(job)
+            return job
+        finally:
+            db.close()
+
+    def _load_page(self, job: BackfillJob) -> List[Dict]:
+        """Next tasks after the checkpoint, keyset-paginated on id"""
+        page_size = max(settings.backfill_batch_size, 1) * max(settings.backfill_concurrency, 1)
+        db = SessionLocal()
+        try:
+            query = db.query(Task.id, Task.title, Task.description, Task.category_source).filter(
+                Task.id > job.last_task_id,
+                Task.category == job.category
+            )
+            if job.completed is not None:
+                query = query.filter(Task.completed == job.completed)
+            rows = query.order_by(Task.id).limit(page_size).all()
+            return [
+                {"id": r.id, "title": r.title, "description": r.description, "category_source": r.category_source}
+                for r in rows
+            ]
+        finally:
+            db.close()
+
+    def _checkpoint(
+        self,
+        job_id: int,
+        token: str,
+        page: List[Dict],
+        categories: Dict[int, str],
+        skip_uncategorized: bool = False
+    ) -> bool:
+        """
+        Bulk-write changed categories and advance the checkpoint in one
+        transaction; returns False (writing nothing) if the claim was lost.
+
+        The checkpoint only moves up to the first uncategorized task, unless
+        skip_uncategorized gives up on them. Tasks after it that changed
+        category have left the job's filter, so the retry sees just the
+        ones still to do.
+        """
+        job_category = None
+        now = datetime.utcnow()
+        db = SessionLocal()
+        try:
+            job = (
+                db.query(BackfillJob)
+                .filter(BackfillJob.id == job_id, BackfillJob.status == "running", BackfillJob.claim_token == token)
+                .with_for_update()
+                .first()
+            )
+            if job is None:
+                return False
+            job_category = job.category
+
+            # Guessed categories - the classifier doesn't learn from them
+            changes = [
+                {
+                    "id": task["id"],
+                    "category": categories[task["id"]],
+                    "category_source": CategorySource.MODEL.value,
+                    "updated_at": now
+                }
+                for task in page
+                if task["id"] in categories and categories[task["id"]] != job_category
+            ]
+            if changes:
+                # ORM bulk UPDATE by primary key - one executemany
+                db.execute(update(Task), changes)
+
+            done = next((i for i, task in enumerate(page) if task["id"] not in categories), len(page))
+            if skip_uncategorized:
+                job.skipped += sum(1 for task in page if task["id"] not in categories)
+                done = len(page)
+            if done:
+                job.last_task_id = page[done - 1]["id"]
+            job.processed += done + sum(1 for change in changes if change["id"] > job.last_task_id)
+            job.updated += len(changes)
+            job.heartbeat_at = now
+            db.commit()
+        finally:
+            db.close()
+
+        by_id = {task["id"]: task for task in page}
+        for change in changes:
+            task = by_id[change["id"]]
+            category_classifier.relabel(
+                user_example(task["title"], task["description"], job_category, task["category_source"]),
+                None
+            )
+        return True
+
+    def _release(self, claims: Dict[int, str]):
+        """Clear heartbeats of the jobs still held so another worker can claim them immediately"""
+        db = SessionLocal()
+        try:
+            for job_id, token in claims.items():
+                db.execute(
+                    update(BackfillJob)
+                    .where(BackfillJob.id == job_id, BackfillJob.status == "running", BackfillJob.claim_token == token)
+                    .values(heartbeat_at=None, claim_token=None)
+                )
+            db.commit()
+        finally:
+            db.close()
+
+    def _finish(self, job_id: int, token: str, status: str, error: Optional[str] = None):
+        db = SessionLocal()
+        try:
+            db.execute(
+                update(BackfillJob)
+                .where(BackfillJob.id == job_id, BackfillJob.status == "running", BackfillJob.claim_token == token)
+                .values(status=status, error=error, heartbeat_at=None, claim_token=None)
+            )
+            db.commit()
+        finally:
+            db.close()
+
+
+# Singleton instance
+backfill_runner = BackfillRunner()
@@ -0,0 +1,79 @@
+"""
+Micro-batching of concurrent async requests
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+class MicroBatcher:
+    """
+    Collect items submitted within a short window and process them together.
+    
+    The first submitted item opens a window of window_ms; everything that
+    arrives before it closes (or until max_size items are queued) is passed
+    to handler as one list. handler must return one result per item, in order.
+    """
+    
+    def __init__(
+        self,
+        handler: Callable[[List[Any]], Awaitable[List[Any]]],
+        window_ms: float,
+        max_size: int
+    ):
+        self._handler = handler
+        self._window = window_ms / 1000
+        self._max_size = max(max_size, 1)
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.batches = 0
+        self.items = 0
+    
+    async def submit(self, item: Any) -> Any:
+        """Queue an item and wait for its result"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        
+        if len(self._pending) >= self._max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self._window, self._flush)
+        
+        return await future
+    
+    def _flush(self):
+        """Hand the queued items to the handler as one batch"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        
+        # Waiters that were cancelled while queued are dropped from the batch
+        batch = [(item, fut) for item, fut in self._pending if not fut.done()]
+        self._pending = []
+        if batch:
+            self.batches += 1
+            self.items += len(batch)
+            asyncio.ensure_future(self._run(batch))
+    
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future]]):
+        """Run the handler and fan results (or the error) out to waiters"""
+        try:
+            results = await self._handler([item for item, _ in batch])
+        except Exception as e:
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        
+        for (_, fut), result in zip(batch, results):
+            if not fut.done():
+                fut.set_result(result)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Batch counters"""
+        return {
+            "window_ms": self._window * 1000,
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": self.items / self.batches if self.batches else 0.0
+        }
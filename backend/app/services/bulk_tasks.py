@@ -0,0 +1,226 @@
+"""
+Set-based bulk create, update and delete of tasks
+"""
+from enum import Enum
+from typing import Any, Dict, Iterator, List, Sequence, Tuple, TypeVar
+
+from sqlalchemy import bindparam, case, delete, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import CategorySource, Task
+from app.schemas import BulkItemResult, TaskBulkUpdateItem, TaskCreate
+from app.services.ai_service import ai_service
+from app.services.classifier import category_classifier, user_example
+
+T = TypeVar("T")
+
+tasks_table = Task.__table__
+
+# Columns an update may not set to null
+REQUIRED_FIELDS = ("title", "completed", "priority", "category")
+
+# A user edit supersedes pending background AI enrichment
+SKIP_PENDING_ENRICHMENT = case(
+    (tasks_table.c.enrichment_status == "pending", "skipped"),
+    else_=tasks_table.c.enrichment_status
+)
+
+
+def _chunks(items: Sequence[T]) -> Iterator[Sequence[T]]:
+    size = max(settings.tasks_bulk_chunk_size, 1)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def column_values(values: Dict[str, Any]) -> Dict[str, Any]:
+    """Enum members to their stored string values"""
+    return {key: value.value if isinstance(value, Enum) else value for key, value in values.items()}
+
+
+def null_required_fields(values: Dict[str, Any]) -> List[str]:
+    """Fields of an update that would set a non-nullable column to null"""
+    return [field for field in REQUIRED_FIELDS if field in values and values[field] is None]
+
+
+def bulk_create(db: Session, tasks: List[TaskCreate]) -> List[BulkItemResult]:
+    """
+    Insert tasks with multi-row INSERT ... RETURNING id, chunk by chunk,
+    in one transaction.
+
+    Tasks without a category get the local classifier's guess, as in
+    POST /tasks; only user-chosen categories are learned from.
+    """
+    rows = []
+    for task in tasks:
+        category = task.category.value
+        source = CategorySource.USER if "category" in task.model_fields_set else CategorySource.MODEL
+        if source == CategorySource.MODEL:
+            category = ai_service.local_category(task.title, task.description) or category
+        rows.append({
+            "title": task.title,
+            "description": task.description,
+            "priority": task.priority.value,
+            "category": category,
+            "category_source": source.value,
+            "due_date": task.due_date,
+            "completed": False
+        })
+
+    conn = db.connection()
+    dialect = conn.dialect
+    ids: List[int] = []
+    for chunk in _chunks(rows):
+        if dialect.name == "sqlite":
+            # SQLite has no ordering guarantee for RETURNING (SQLAlchemy would
+            # fall back to one row per statement), but it assigns rowids in
+            # VALUES order while this transaction holds the write lock
+            result = conn.execute(insert(tasks_table).returning(tasks_table.c.id), list(chunk))
+            ids.extend(sorted(result.scalars().all()))
+        elif dialect.insert_executemany_returning_sort_by_parameter_order:
+            # Batched into multi-row VALUES with ids returned in input order
+            result = conn.execute(
+                insert(tasks_table).returning(tasks_table.c.id, sort_by_parameter_order=True),
+                list(chunk)
+            )
+            ids.extend(result.scalars().all())
+        else:
+            ids.extend(conn.execute(insert(tasks_table), row).inserted_primary_key[0] for row in chunk)
+    db.commit()
+
+    for row in rows:
+        category_classifier.relabel(None, user_example(row["title"], row["description"], row["category"], row["category_source"]))
+
+    return [BulkItemResult(index=i, id=task_id, status="created") for i, task_id in enumerate(ids)]
+
+
+def bulk_update(db: Session, items: List[TaskBulkUpdateItem]) -> List[BulkItemResult]:
+    """
+    Apply partial updates, chunk by chunk, in one transaction.
+
+    Tasks receiving identical changes (e.g. mass-completing) share one
+    UPDATE ... WHERE id IN (...); the remaining ones run as one executemany
+    per set of changed fields. The existing rows of each chunk are read
+    once up front to report missing ids and keep the classifier in step.
+    """
+    results: List[BulkItemResult] = [None] * len(items)
+    pending: List[Tuple[int, int, Dict[str, Any]]] = []
+    seen = set()
+    for index, item in enumerate(items):
+        values = column_values(item.model_dump(exclude_unset=True, exclude={"id"}))
+        nulls = null_required_fields(values)
+        if "category" in values:
+            values["category_source"] = CategorySource.USER.value
+        if item.id in seen:
+            results[index] = BulkItemResult(index=index, id=item.id, status="duplicate", detail="Task id repeated in request")
+        elif nulls:
+            results[index] = BulkItemResult(index=index, id=item.id, status="invalid", detail=f"{nulls[0]} cannot be null")
+        else:
+            pending.append((index, item.id, values))
+        seen.add(item.id)
+
+    conn = db.connection()
+    relabels = []
+    for chunk in _chunks(pending):
+        existing = {
+            row.id: row
+            for row in conn.execute(
+                select(
+                    tasks_table.c.id, tasks_table.c.title, tasks_table.c.description,
+                    tasks_table.c.category, tasks_table.c.category_source
+                )
+                .where(tasks_table.c.id.in_([task_id for _, task_id, _ in chunk]))
+            )
+        }
+
+        same_change: Dict[Tuple, List[int]] = {}
+        for index, task_id, values in chunk:
+            if task_id not in existing:
+                results[index] = BulkItemResult(index=index, id=task_id, status="not_found", detail=f"Task with id {task_id} not found")
+            elif not values:
+                results[index] = BulkItemResult(index=index, id=task_id, status="unchanged")
+            else:
+                same_change.setdefault(tuple(sorted(values.items())), []).append(task_id)
+                results[index] = BulkItemResult(index=index, id=task_id, status="updated")
+
+        by_fields: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+        for change, task_ids in same_change.items():
+            if len(task_ids) > 1:
+                conn.execute(
+                    update(tasks_table)
+                    .where(tasks_table.c.id.in_(task_ids))
+                    .values(**dict(change), enrichment_status=SKIP_PENDING_ENRICHMENT)
+                )
+            else:
+                fields = tuple(key for key, _ in change)
+                by_fields.setdefault(fields, []).append(
+                    {"task_id": task_ids[0], **{f"new_{key}": value for key, value in change}}
+                )
+
+        for fields, params in by_fields.items():
+            conn.execute(
+                update(tasks_table)
+                .where(tasks_table.c.id == bindparam("task_id"))
+                .values({
+                    **{field: bindparam(f"new_{field}") for field in fields},
+                    "enrichment_status": SKIP_PENDING_ENRICHMENT
+                }),
+                params
+            )
+
+        for change, task_ids in same_change.items():
+            change = dict(change)
+            for task_id in task_ids:
+                old = existing[task_id]
+                relabels.append((
+                    user_example(old.title, old.description, old.category, old.category_source),
+                    user_example(
+                        change.get("title", old.title),
+                        change.get("description", old.description),
+                        change.get("category", old.category),
+                        change.get("category_source", old.category_source)
+                    )
+                ))
+    db.commit()
+
+    for old, new in relabels:
+        category_classifier.relabel(old, new)
+    return results
+
+
+def bulk_delete(db: Session, ids: List[int]) -> List[BulkItemResult]:
+    """Delete tasks with DELETE ... WHERE id IN (...) RETURNING, chunk by chunk, in one transaction"""
+    results: List[BulkItemResult] = [None] * len(ids)
+    pending: List[Tuple[int, int]] = []
+    seen = set()
+    for index, task_id in enumerate(ids):
+        if task_id in seen:
+            results[index] = BulkItemResult(index=index, id=task_id, status="duplicate", detail="Task id repeated in request")
+        else:
+            pending.append((index, task_id))
+        seen.add(task_id)
+
+    conn = db.connection()
+    columns = (tasks_table.c.id, tasks_table.c.title, tasks_table.c.description, tasks_table.c.category, tasks_table.c.category_source)
+    forgotten = []
+    for chunk in _chunks(pending):
+        chunk_ids = [task_id for _, task_id in chunk]
+        if conn.dialect.delete_returning:
+            deleted = conn.execute(delete(tasks_table).where(tasks_table.c.id.in_(chunk_ids)).returning(*columns)).all()
+        else:
+            deleted = conn.execute(select(*columns).where(tasks_table.c.id.in_(chunk_ids))).all()
+            conn.execute(delete(tasks_table).where(tasks_table.c.id.in_(chunk_ids)))
+
+        examples = {row.id: user_example(row.title, row.description, row.category, row.category_source) for row in deleted}
+        for index, task_id in chunk:
+            if task_id in examples:
+                forgotten.append(examples[task_id])
+                results[index] = BulkItemResult(index=index, id=task_id, status="deleted")
+            else:
+                results[index] = BulkItemResult(index=index, id=task_id, status="not_found", detail=f"Task with id {task_id} not found")
+
+    db.commit()
+
+    for example in forgotten:
+        category_classifier.relabel(example, None)
+    return results
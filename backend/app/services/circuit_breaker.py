@@ -0,0 +1,120 @@
+"""
+Circuit breaker for calls to the upstream AI provider
+"""
+import threading
+import time
+from typing import Any, Dict
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is refused because the circuit is open"""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    - closed: calls go through; failure_threshold failed or slow calls in a
+      row open the circuit
+    - open: calls are refused until reset_timeout seconds have passed
+    - half_open: up to half_open_max_calls probe calls are let through; a
+      successful probe closes the circuit, a failed one re-opens it
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int,
+        reset_timeout: float,
+        slow_call_threshold: float,
+        half_open_max_calls: int = 1
+    ):
+        self.failure_threshold = max(failure_threshold, 1)
+        self.reset_timeout = reset_timeout
+        self.slow_call_threshold = slow_call_threshold
+        self.half_open_max_calls = max(half_open_max_calls, 1)
+
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+
+        self.times_opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def is_open(self) -> bool:
+        """True while calls are being refused outright"""
+        return self.state == self.OPEN
+
+    def allow_request(self) -> bool:
+        """Reserve permission for one call; every True must be followed by a record_* call"""
+        with self._lock:
+            self._maybe_half_open()
+
+            if self._state == self.CLOSED:
+                return True
+
+            if self._state == self.HALF_OPEN and self._probes_in_flight < self.half_open_max_calls:
+                self._probes_in_flight += 1
+                return True
+
+            self.rejected += 1
+            return False
+
+    def record_success(self, duration: float):
+        """Record a completed call; calls slower than slow_call_threshold count as failures"""
+        if duration >= self.slow_call_threshold:
+            self.record_failure()
+            return
+
+        with self._lock:
+            self._release_probe()
+            self._consecutive_failures = 0
+            self._state = self.CLOSED
+
+    def record_failure(self):
+        """Record a failed call"""
+        with self._lock:
+            was_probe = self._release_probe()
+            self._consecutive_failures += 1
+            if was_probe or self._consecutive_failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.times_opened += 1
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def record_cancelled(self):
+        """Release a reservation for a call that was abandoned before completing"""
+        with self._lock:
+            self._release_probe()
+
+    def _release_probe(self) -> bool:
+        if self._state == self.HALF_OPEN and self._probes_in_flight > 0:
+            self._probes_in_flight -= 1
+            return True
+        return False
+
+    def _maybe_half_open(self):
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._probes_in_flight = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Breaker state and counters"""
+        state = self.state
+        return {
+            "state": state,
+            "consecutive_failures": self._consecutive_failures,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected
+        }
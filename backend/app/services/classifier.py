@@ -0,0 +1,168 @@
+"""
+Local incremental category classifier (multinomial naive Bayes)
+"""
+import logging
+import math
+import re
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.config import settings
+from app.models import CategorySource, Task
+from app.schemas import Category
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[a-z][a-z']+")
+STOPWORDS = frozenset(
+    "the a an to for of and or in on at by with my me i is be it this that from up "
+    "need have get do go remind remember please tomorrow today next week".split()
+)
+
+
+Example = Tuple[str, Optional[str], str]
+
+
+def user_example(title: str, description: Optional[str], category: str, source: str) -> Optional[Example]:
+    """The row as a training example if its category was chosen by the user, else None"""
+    return (title, description, category) if source == CategorySource.USER.value else None
+
+
+class CategoryClassifier:
+    """
+    Multinomial naive Bayes over title/description tokens.
+
+    Trained from the tasks table at startup and updated incrementally as
+    users create, recategorize or delete tasks. Only categories users chose
+    (category_source "user") are learned from, never the classifier's or
+    the AI's own guesses. Rows labelled OTHER are not learned from either -
+    it is the default for unlabelled tasks, not a real signal. The model lives in each process only: the database is the one
+    shared source, so edits made through other workers are picked up on the
+    next start instead of being overwritten by a stale copy.
+    """
+
+    def __init__(self, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.doc_counts: Counter = Counter()
+        self.token_counts: Dict[str, Counter] = {}
+        self.token_totals: Counter = Counter()
+        self.vocabulary: Counter = Counter()
+
+    @property
+    def samples(self) -> int:
+        return sum(self.doc_counts.values())
+
+    def tokenize(self, title: str, description: Optional[str] = None) -> List[str]:
+        """Lowercase word tokens without stopwords"""
+        text = f"{title} {description or ''}".lower()
+        return [t for t in TOKEN_PATTERN.findall(text) if t not in STOPWORDS]
+
+    def learn(self, title: str, description: Optional[str], category: str):
+        """Add one labelled example"""
+        self._update(title, description, category, 1)
+
+    def forget(self, title: str, description: Optional[str], category: str):
+        """Remove a previously learned example"""
+        self._update(title, description, category, -1)
+
+    def relabel(self, old: Optional[Example], new: Optional[Example]):
+        """
+        Replace a learned (title, description, category) example with its
+        edited version; None stands for a row that isn't learned from
+        """
+        if old != new:
+            if old is not None:
+                self.forget(*old)
+            if new is not None:
+                self.learn(*new)
+
+    def _update(self, title: str, description: Optional[str], category: str, weight: int):
+        if category == Category.OTHER.value or category not in Category._value2member_map_:
+            return
+
+        tokens = Counter(self.tokenize(title, description))
+        with self._lock:
+            if weight < 0 and self.doc_counts[category] <= 0:
+                return
+
+            self.doc_counts[category] += weight
+            counts = self.token_counts.setdefault(category, Counter())
+            for token, n in tokens.items():
+                counts[token] += weight * n
+                self.vocabulary[token] += weight * n
+                if counts[token] <= 0:
+                    del counts[token]
+                if self.vocabulary[token] <= 0:
+                    del self.vocabulary[token]
+            self.token_totals[category] = max(self.token_totals[category] + weight * sum(tokens.values()), 0)
+
+    def predict(self, title: str, description: Optional[str] = None) -> Tuple[str, float]:
+        """
+        Most likely category and its posterior probability.
+
+        Returns (OTHER, 0.0) until enough examples of at least two categories
+        have been learned, or when none of the input tokens have been seen.
+        """
+        tokens = self.tokenize(title, description)
+        with self._lock:
+            total_docs = self.samples
+            known = [t for t in tokens if t in self.vocabulary]
+            trained_classes = sum(1 for docs in self.doc_counts.values() if docs > 0)
+            if total_docs < self.min_samples or trained_classes < 2 or not known:
+                return Category.OTHER.value, 0.0
+
+            vocab_size = len(self.vocabulary)
+            scores = {}
+            for category, docs in self.doc_counts.items():
+                if docs <= 0:
+                    continue
+                counts = self.token_counts.get(category, Counter())
+                denominator = self.token_totals[category] + vocab_size
+                score = math.log(docs / total_docs)
+                for token in known:
+                    score += math.log((counts[token] + 1) / denominator)
+                scores[category] = score
+
+        # Normalize log scores into posterior probabilities
+        best = max(scores, key=scores.get)
+        top = scores[best]
+        norm = sum(math.exp(s - top) for s in scores.values())
+        return best, 1 / norm
+
+    def fit(self, rows: Iterable[Tuple[str, Optional[str], str]]):
+        """Rebuild the model from (title, description, category) rows"""
+        with self._lock:
+            self._reset()
+        for title, description, category in rows:
+            self.learn(title, description, category)
+
+    def stats(self) -> Dict[str, int]:
+        """Training set size"""
+        return {"samples": self.samples, "vocabulary": len(self.vocabulary)}
+
+
+def train_classifier():
+    """Train the category model from the user-labelled tasks"""
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(Task.title, Task.description, Task.category)
+            .filter(Task.category != Category.OTHER.value, Task.category_source == CategorySource.USER.value)
+            .yield_per(1000)
+        )
+        category_classifier.fit(rows)
+    finally:
+        db.close()
+
+    logger.info(f"Trained category model from {category_classifier.samples} tasks")
+
+
+# Singleton instance
+category_classifier = CategoryClassifier(min_samples=settings.category_model_min_samples)
@@ -0,0 +1,242 @@
+"""
+Background AI enrichment of tasks created write-first
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import or_, update
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models import CategorySource, Task
+from app.services.ai_service import ai_service, parse_due_date
+from app.services.scheduler import AIPriority
+
+logger = logging.getLogger(__name__)
+
+
+class EnrichmentWorker:
+    """
+    Pool of asyncio workers that refine write-first tasks with the LLM.
+
+    The queue is the tasks table itself: rows with
+    enrichment_status='pending' are swept up on startup and periodically,
+    so nothing is lost across restarts or dead workers. New ids are also
+    pushed to an in-memory queue for immediate pickup. Before calling the
+    LLM a worker leases the row with a conditional UPDATE, so with several
+    app workers each task is enriched once; the lease is pushed out to the
+    retry time after a failure. A task edited by the user while pending is
+    left as the user wrote it.
+    """
+
+    def __init__(self):
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._workers: List[asyncio.Task] = []
+        self._sweeper: Optional[asyncio.Task] = None
+        self._attempts: Dict[int, int] = {}
+
+    async def start(self):
+        """Spawn the workers and the sweeper that queues everything still pending"""
+        if self._workers:
+            return
+        self._workers = [
+            asyncio.create_task(self._work())
+            for _ in range(max(settings.ai_enrichment_workers, 1))
+        ]
+        self._sweeper = asyncio.create_task(self._sweep())
+
+    async def stop(self):
+        """Stop the workers; unfinished tasks stay pending in the database"""
+        tasks = self._workers + ([self._sweeper] if self._sweeper else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._sweeper = None
+
+    def enqueue(self, task_id: int):
+        """Schedule a freshly created task for enrichment"""
+        self._queue.put_nowait(task_id)
+
+    def stats(self) -> Dict[str, int]:
+        """Queue depth and workers"""
+        return {"queued": self._queue.qsize(), "workers": len(self._workers), "retrying": len(self._attempts)}
+
+    async def _sweep(self):
+        """Queue pending tasks nobody holds - left by restarts, dead workers or expired leases"""
+        while True:
+            try:
+                for task_id in await asyncio.to_thread(self._find_claimable):
+                    self._queue.put_nowait(task_id)
+            except Exception as e:
+                logger.error(f"Enrichment sweep failed: {e}")
+            await asyncio.sleep(max(settings.ai_enrichment_lease / 2, 1))
+
+    async def _work(self):
+        while True:
+            task_id = await self._queue.get()
+            try:
+                await self._enrich(task_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Enrichment of task {task_id} failed: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _enrich(self, task_id: int):
+        snapshot = await asyncio.to_thread(self._claim, task_id)
+        if snapshot is None:
+            self._attempts.pop(task_id, None)
+            return
+
+        try:
+            if not ai_service.is_available():
+                raise RuntimeError("AI unavailable")
+
+            parsed = await ai_service.parse_with_ai(snapshot["source_text"], priority=AIPriority.BULK)
+            await asyncio.to_thread(self._apply, snapshot, parsed)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._retry_later(snapshot, e)
+            return
+        self._attempts.pop(task_id, None)
+
+    def _retry_later(self, snapshot: dict, error: Exception):
+        """Back off and retry, giving up after ai_enrichment_max_attempts"""
+        task_id = snapshot["id"]
+        attempts = self._attempts.get(task_id, 0) + 1
+        if attempts >= settings.ai_enrichment_max_attempts:
+            logger.error(f"Enrichment of task {task_id} failed permanently: {error}")
+            self._attempts.pop(task_id, None)
+            asyncio.create_task(asyncio.to_thread(self._mark_failed, snapshot))
+            return
+
+        self._attempts[task_id] = attempts
+        delay = settings.ai_enrichment_retry_delay * 2 ** (attempts - 1)
+        logger.warning(f"Enrichment of task {task_id} failed ({error}); retrying in {delay:.0f}s")
+        # Keep holding the task until the retry, so no other worker jumps the backoff
+        asyncio.create_task(asyncio.to_thread(self._extend_lease, snapshot, datetime.utcnow() + timedelta(seconds=delay)))
+        # (requeued a moment after the lease runs out, so the claim succeeds)
+        asyncio.get_running_loop().call_later(delay + 1, self._queue.put_nowait, task_id)
+
+    # Database work - run off the event loop via asyncio.to_thread
+
+    def _find_claimable(self) -> List[int]:
+        now = datetime.utcnow()
+        db = SessionLocal()
+        try:
+            rows = (
+                db.query(Task.id)
+                .filter(
+                    Task.enrichment_status == "pending",
+                    or_(Task.enrichment_lease_until.is_(None), Task.enrichment_lease_until <= now)
+                )
+                .order_by(Task.id)
+                .all()
+            )
+            return [row.id for row in rows]
+        finally:
+            db.close()
+
+    def _claim(self, task_id: int) -> Optional[dict]:
+        """Lease a pending task and snapshot it; None when it is done or another worker holds it"""
+        now = datetime.utcnow()
+        lease_until = now + timedelta(seconds=settings.ai_enrichment_lease)
+        db = SessionLocal()
+        try:
+            result = db.execute(
+                update(Task)
+                .where(
+                    Task.id == task_id,
+                    Task.enrichment_status == "pending",
+                    or_(Task.enrichment_lease_until.is_(None), Task.enrichment_lease_until <= now)
+                )
+                # Taking the lease isn't an edit - leave updated_at alone
+                .values(enrichment_lease_until=lease_until, updated_at=Task.updated_at)
+            )
+            if result.rowcount != 1:
+                db.rollback()
+                return None
+
+            task = db.query(Task).filter(Task.id == task_id).first()
+            snapshot = {
+                "id": task.id,
+                "title": task.title,
+                "description": task.description,
+                "category": task.category,
+                "source_text": task.source_text or task.title,
+                "updated_at": task.updated_at,
+                "lease_until": lease_until
+            }
+            db.commit()
+            return snapshot
+        finally:
+            db.close()
+
+    def _extend_lease(self, snapshot: dict, lease_until: datetime):
+        db = SessionLocal()
+        try:
+            db.execute(
+                update(Task)
+                .where(Task.id == snapshot["id"], Task.enrichment_lease_until == snapshot["lease_until"])
+                .values(enrichment_lease_until=lease_until, updated_at=Task.updated_at)
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def _apply(self, snapshot: dict, parsed: dict):
+        """Write the AI result unless the row changed since it was loaded or the lease was lost"""
+        db = SessionLocal()
+        try:
+            # The category is the model's guess, so the classifier doesn't learn from it
+            values = {"enrichment_status": "done", "enrichment_lease_until": None, "updated_at": datetime.utcnow()}
+            held = (
+                Task.id == snapshot["id"],
+                Task.enrichment_status == "pending",
+                Task.enrichment_lease_until == snapshot["lease_until"]
+            )
+
+            result = db.execute(
+                update(Task)
+                .where(*held, Task.updated_at == snapshot["updated_at"])
+                .values(
+                    title=parsed["title"],
+                    description=parsed.get("description"),
+                    priority=parsed["priority"],
+                    category=parsed["category"],
+                    category_source=CategorySource.MODEL.value,
+                    due_date=parse_due_date(parsed.get("due_date")),
+                    **values
+                )
+            )
+            if result.rowcount == 0:
+                # Edited meanwhile - keep the user's version, just close out enrichment
+                db.execute(update(Task).where(*held).values(**values))
+            db.commit()
+        finally:
+            db.close()
+
+    def _mark_failed(self, snapshot: dict):
+        db = SessionLocal()
+        try:
+            db.execute(
+                update(Task)
+                .where(
+                    Task.id == snapshot["id"],
+                    Task.enrichment_status == "pending",
+                    Task.enrichment_lease_until == snapshot["lease_until"]
+                )
+                .values(enrichment_status="failed", enrichment_lease_until=None, updated_at=datetime.utcnow())
+            )
+            db.commit()
+        finally:
+            db.close()
+
+
+# Singleton instance
+enrichment_worker = EnrichmentWorker()
@@ -0,0 +1,98 @@
+"""
+Hedged requests for latency-sensitive AI calls
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+class Hedger:
+    """
+    Issue a backup call when the first one is slower than usual.
+
+    If a call hasn't finished after the observed latency percentile
+    (never less than min_delay), an identical second call is started and
+    whichever succeeds first wins; the other is cancelled. Hedges are capped
+    at budget (e.g. 0.05 = 5%) of all calls, and no hedging happens until
+    min_samples latencies have been observed.
+    """
+
+    def __init__(
+        self,
+        percentile: float,
+        min_delay: float,
+        budget: float,
+        window: int = 500,
+        min_samples: int = 20
+    ):
+        self.percentile = min(max(percentile, 0.0), 1.0)
+        self.min_delay = min_delay
+        self.budget = budget
+        self.min_samples = min_samples
+        self._latencies: deque = deque(maxlen=window)
+
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None while there is too little data"""
+        if len(self._latencies) < self.min_samples:
+            return None
+        ordered = sorted(self._latencies)
+        index = min(int(len(ordered) * self.percentile), len(ordered) - 1)
+        return max(ordered[index], self.min_delay)
+
+    def _within_budget(self) -> bool:
+        return self.hedges + 1 <= self.budget * self.calls
+
+    async def run(self, call: Callable[[], Awaitable[Any]]) -> Any:
+        """Run call(), hedging it with a second identical call when it is slow"""
+        self.calls += 1
+        delay = self.delay()
+        primary = asyncio.ensure_future(self._timed(call))
+        hedge: Optional[asyncio.Future] = None
+
+        try:
+            if delay is None:
+                return await primary
+
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done or not self._within_budget():
+                return await primary
+
+            self.hedges += 1
+            hedge = asyncio.ensure_future(self._timed(call))
+            pending = {primary, hedge}
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for finished in done:
+                    if finished.exception() is None:
+                        if finished is hedge:
+                            self.hedge_wins += 1
+                        return finished.result()
+                    error = finished.exception()
+            raise error
+        finally:
+            for attempt in (primary, hedge):
+                if attempt is not None and not attempt.done():
+                    attempt.cancel()
+
+    async def _timed(self, call: Callable[[], Awaitable[Any]]) -> Any:
+        started = time.monotonic()
+        result = await call()
+        self._latencies.append(time.monotonic() - started)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Hedging counters"""
+        delay = self.delay()
+        return {
+            "calls": self.calls,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "hedge_rate": self.hedges / self.calls if self.calls else 0.0,
+            "current_delay": round(delay, 3) if delay is not None else None
+        }
@@ -0,0 +1,116 @@
+"""
+Version-keyed cache for /ai/insights
+"""
+import hashlib
+import json
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.services.ai_service import ai_service
+from app.services.singleflight import SingleFlight
+
+
+class InsightsEntry:
+    """A cached insights response for one version of the tasks table"""
+
+    __slots__ = ("version", "body", "etag", "last_modified")
+
+    def __init__(self, version: Tuple, body: Dict[str, Any], etag: str, last_modified: datetime):
+        self.version = version
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+
+
+class InsightsCache:
+    """
+    Cache the insights response per data version of the tasks table.
+
+    The version is (row count, max(updated_at)) - every insert, update and
+    delete changes it. While it is unchanged the stored response is served
+    without touching the aggregates or Gemini. When it changes the counts
+    are recomputed, but the AI summary is only regenerated once the stats
+    have drifted by min_change (fraction of all tasks) or the summary is
+    older than max_age seconds. Entries are per worker.
+    """
+
+    def __init__(self, min_change: float, max_age: float):
+        self.min_change = min_change
+        self.max_age = max_age
+        self._entry: Optional[InsightsEntry] = None
+        self._summary: Optional[Dict[str, Any]] = None
+        self._summary_stats: Optional[Dict[str, Any]] = None
+        self._summary_at = 0.0
+        self._inflight = SingleFlight()
+        self.hits = 0
+        self.rebuilds = 0
+        self.summaries = 0
+
+    async def get(
+        self,
+        version: Tuple,
+        load_stats: Callable[[], Tuple[List[Dict], Dict[str, Any]]]
+    ) -> InsightsEntry:
+        """Cached entry for version, rebuilding it (once, for concurrent callers) if stale"""
+        entry = self._entry
+        if entry is not None and entry.version == version:
+            self.hits += 1
+            return entry
+        return await self._inflight.do(("insights", version), lambda: self._rebuild(version, load_stats))
+
+    async def _rebuild(self, version: Tuple, load_stats) -> InsightsEntry:
+        tasks_data, stats = load_stats()
+        self.rebuilds += 1
+
+        if self._summary_is_stale(stats):
+            # Fallback insights quote the live numbers, so only AI ones are kept
+            reusable = ai_service.is_available()
+            insights = await ai_service.generate_insights(tasks_data, stats)
+            self.summaries += 1
+            self._summary = insights if reusable else None
+            self._summary_stats = stats
+            self._summary_at = time.monotonic()
+        else:
+            insights = self._summary
+
+        body = {
+            "total_tasks": stats["total"],
+            "completed_tasks": stats["completed"],
+            "completion_rate": stats["completion_rate"],
+            "tasks_by_category": stats["by_category"],
+            "tasks_by_priority": stats["by_priority"],
+            "ai_summary": insights["ai_summary"],
+            "ai_tips": insights["ai_tips"]
+        }
+        etag = '"' + hashlib.sha1(json.dumps(body, sort_keys=True).encode()).hexdigest() + '"'
+
+        previous = self._entry
+        if previous is not None and previous.etag == etag:
+            last_modified = previous.last_modified
+        else:
+            last_modified = datetime.now(timezone.utc).replace(microsecond=0)
+
+        self._entry = InsightsEntry(version, body, etag, last_modified)
+        return self._entry
+
+    def _summary_is_stale(self, stats: Dict[str, Any]) -> bool:
+        """True when the AI summary should be regenerated for these stats"""
+        if self._summary is None or time.monotonic() - self._summary_at > self.max_age:
+            return True
+
+        old = self._summary_stats
+        diffs = [abs(stats["total"] - old["total"]), abs(stats["completed"] - old["completed"])]
+        for key in ("by_category", "by_priority"):
+            for name in set(old[key]) | set(stats[key]):
+                diffs.append(abs(stats[key].get(name, 0) - old[key].get(name, 0)))
+        return max(diffs) >= max(self.min_change * max(stats["total"], old["total"]), 1)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit and regeneration counters"""
+        return {"hits": self.hits, "rebuilds": self.rebuilds, "ai_summaries": self.summaries}
+
+
+# Singleton instance
+insights_cache = InsightsCache(settings.ai_insights_min_change, settings.ai_insights_max_age)
@@ -0,0 +1,163 @@
+"""
+Extraction of JSON objects from LLM responses
+"""
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+# Characters that can change the scanner state; everything else is skipped in C
+STRUCTURAL = re.compile(r'[{}\[\]"\\]')
+CLOSERS = {"{": "}", "[": "]"}
+
+# How often to retry past an opening brace that never closed (stray "{" in prose)
+MAX_RESCANS = 8
+
+
+class JSONScanner:
+    """
+    Incremental, brace- and string-aware scanner for JSON objects in text.
+
+    feed() accepts the response in one piece or chunk by chunk (streaming)
+    and returns the text of each top-level {...} completed so far, in one
+    pass: braces inside strings and escaped quotes are handled, prose and
+    code fences around the objects are skipped. partial() repairs an object
+    cut off mid-way (truncated output) down to its last complete nested
+    value.
+    """
+
+    def __init__(self):
+        self._text = ""
+        self._offset = 0  # Characters already trimmed from the front of _text
+        self._pos = 0
+        self._start: Optional[int] = None
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape_at = -1
+        self._safe: Optional[Tuple[int, List[str]]] = None
+
+    @property
+    def open_start(self) -> Optional[int]:
+        """Offset (in the text fed so far) of an object that hasn't closed, if any"""
+        return None if self._start is None else self._start + self._offset
+
+    def feed(self, chunk: str) -> List[str]:
+        """Scan more text; returns the objects completed by it"""
+        self._text += chunk
+        text = self._text
+        found = []
+
+        for match in STRUCTURAL.finditer(text, self._pos):
+            i = match.start()
+            if i == self._escape_at:
+                continue
+            char = match.group()
+
+            if self._start is None:
+                if char == "{":
+                    self._start, self._stack, self._safe = i, ["}"], None
+                continue
+
+            if self._in_string:
+                if char == '"':
+                    self._in_string = False
+                elif char == "\\":
+                    self._escape_at = i + 1
+            elif char == '"':
+                self._in_string = True
+            elif char in CLOSERS:
+                self._stack.append(CLOSERS[char])
+            elif char == self._stack[-1]:
+                self._stack.pop()
+                if not self._stack:
+                    found.append(text[self._start:i + 1])
+                    self._start = None
+                else:
+                    self._safe = (i + 1, self._stack.copy())
+            else:
+                # Mismatched bracket - not JSON after all
+                self._start, self._stack, self._in_string, self._safe = None, [], False, None
+
+        self._pos = len(text)
+        self._trim()
+        return found
+
+    def _trim(self):
+        """Drop text that can no longer be part of an object"""
+        cut = self._pos if self._start is None else self._start
+        if cut == 0:
+            return
+        self._text = self._text[cut:]
+        self._offset += cut
+        self._pos -= cut
+        self._escape_at -= cut
+        if self._start is not None:
+            self._start -= cut
+        if self._safe is not None:
+            self._safe = (self._safe[0] - cut, self._safe[1])
+
+    def partial(self) -> Optional[str]:
+        """The unfinished object cut back to its last complete nested value and closed, if any"""
+        if self._start is None or self._safe is None:
+            return None
+        end, stack = self._safe
+        return self._text[self._start:end] + "".join(reversed(stack))
+
+
+def _matches(value: Any, required: Optional[Dict[str, Any]]) -> bool:
+    """True for a dict whose required keys hold values of the given types"""
+    if not isinstance(value, dict):
+        return False
+    return all(isinstance(value.get(key), kind) for key, kind in (required or {}).items())
+
+
+def _loads(candidate: str) -> Any:
+    try:
+        return json.loads(candidate)
+    except ValueError:
+        return None
+
+
+def extract_json(text: str, required: Optional[Dict[str, Any]] = None, partial: bool = True) -> Dict:
+    """
+    The JSON object in an LLM response that matches required, or {}.
+
+    required maps keys to the type(s) their values must have, e.g.
+    {"order": list}; candidates that don't match (stray {placeholders},
+    invalid JSON) are skipped. When several match, the one with the most
+    keys wins, and the last one on ties - models echo the format example
+    before answering. With partial=True a truncated response yields its
+    complete leading part, e.g. the finished items of a cut-off "results"
+    array.
+    """
+    stripped = text.strip()
+    # Fast path: the whole response is the object
+    if stripped.startswith("{"):
+        value = _loads(stripped)
+        if _matches(value, required):
+            return value
+
+    best = None
+    repaired = None
+    offset = 0
+    for _ in range(MAX_RESCANS):
+        scanner = JSONScanner()
+        for candidate in scanner.feed(text[offset:]):
+            value = _loads(candidate)
+            if _matches(value, required) and (best is None or len(value) >= len(best)):
+                best = value
+
+        if best is not None:
+            return best
+        if repaired is None and partial:
+            repaired = scanner.partial()
+
+        if scanner.open_start is None:
+            break
+        # A "{" in prose never closed and swallowed the rest - look past it
+        offset += scanner.open_start + 1
+
+    if repaired is not None:
+        value = _loads(repaired)
+        if _matches(value, required):
+            return value
+    return {}
@@ -0,0 +1,196 @@
+"""
+LLM backends - Google Gemini, and an in-process fake for offline load tests
+"""
+import hashlib
+import json
+import logging
+import math
+import random
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Iterator, List, Optional
+
+from app.config import settings
+from app.schemas import Category
+from app.services.local_parser import parse_task_text
+
+logger = logging.getLogger(__name__)
+
+
+class LLMBackend(ABC):
+    """Blocking text generation; AIService runs these calls on its own executor"""
+
+    name = "base"
+    model_name = ""
+
+    @abstractmethod
+    def generate(self, prompt: str, timeout: float) -> str:
+        """Full response text for prompt"""
+
+    @abstractmethod
+    def stream(self, prompt: str, timeout: float) -> Iterator[str]:
+        """Response text in chunks as they are generated"""
+
+
+class GeminiBackend(LLMBackend):
+    """Google Gemini via google.generativeai"""
+
+    name = "gemini"
+
+    def __init__(self, api_key: str, model_name: str):
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        self.model_name = model_name
+        self._model = genai.GenerativeModel(model_name)
+
+    def generate(self, prompt: str, timeout: float) -> str:
+        # The client-side timeout frees the worker thread when our deadline passes
+        response = self._model.generate_content(prompt, request_options={"timeout": timeout})
+        return response.text
+
+    def stream(self, prompt: str, timeout: float) -> Iterator[str]:
+        response = self._model.generate_content(prompt, stream=True, request_options={"timeout": timeout})
+        for chunk in response:
+            if chunk.text:
+                yield chunk.text
+
+
+class FakeBackendError(Exception):
+    """Failure injected by FakeBackend"""
+
+
+class FakeBackend(LLMBackend):
+    """
+    Stand-in for Gemini with configurable latency, errors and responses.
+
+    Latency is log-normal with the given median and 99th percentile
+    (equal values give a fixed latency); a call slower than the timeout
+    fails after the timeout like a real client would. error_rate is the
+    fraction of calls that raise. Responses come from the canned file first
+    (a JSON list of {"match": regex, "response": text}), otherwise they are
+    templated from the prompt so every /ai/* path gets well-formed output.
+    A non-zero seed makes a run reproducible.
+    """
+
+    name = "fake"
+    model_name = "fake"
+
+    CHUNK_SIZE = 16
+
+    def __init__(
+        self,
+        latency_ms: float,
+        latency_p99_ms: float,
+        error_rate: float = 0.0,
+        seed: int = 0,
+        responses_path: str = ""
+    ):
+        self.median = max(latency_ms, 0.0) / 1000
+        self.sigma = math.log(latency_p99_ms / latency_ms) / 2.326 if latency_p99_ms > latency_ms > 0 else 0.0
+        self.error_rate = error_rate
+        self._random = random.Random(seed or None)
+        self._lock = threading.Lock()
+        self._canned = []
+        if responses_path:
+            with open(responses_path) as f:
+                self._canned = [(re.compile(item["match"]), item["response"]) for item in json.load(f)]
+
+    def generate(self, prompt: str, timeout: float) -> str:
+        self._wait(self._latency(), timeout)
+        return self._respond(prompt)
+
+    def stream(self, prompt: str, timeout: float) -> Iterator[str]:
+        text = self._respond(prompt)
+        chunks = [text[i:i + self.CHUNK_SIZE] for i in range(0, len(text), self.CHUNK_SIZE)] or [""]
+        # Time to first chunk follows the latency distribution, the rest trickles in
+        self._wait(self._latency() / 2, timeout)
+        step = self.median / 2 / len(chunks)
+        for chunk in chunks:
+            yield chunk
+            time.sleep(step)
+
+    def _latency(self) -> float:
+        if self.sigma == 0:
+            return self.median
+        with self._lock:
+            return self.median * math.exp(self._random.gauss(0, self.sigma))
+
+    def _wait(self, latency: float, timeout: float):
+        if latency > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"Fake LLM call took longer than {timeout}s")
+        time.sleep(latency)
+        with self._lock:
+            failed = self._random.random() < self.error_rate
+        if failed:
+            raise FakeBackendError("Injected fake LLM failure")
+
+    def _respond(self, prompt: str) -> str:
+        for pattern, response in self._canned:
+            if pattern.search(prompt):
+                return response
+
+        if '"results"' in prompt:
+            items = re.findall(r'^(\d+): (".*")$', prompt, re.M)
+            return json.dumps({"results": [
+                {"index": int(index), **self._parse(json.loads(text))} for index, text in items
+            ]})
+        if 'Input: "' in prompt:
+            return json.dumps(self._parse(re.search(r'Input: "(.*)"', prompt).group(1)))
+        if "Categorize each" in prompt:
+            return json.dumps({task_id: self._category(line) for task_id, line in re.findall(r'^(\d+): (.*)$', prompt, re.M)})
+        if "Categorize this task" in prompt:
+            return self._category(prompt)
+        if "productivity coach" in prompt:
+            summary = "You are making steady progress. Focus on overdue and urgent work first."
+            tips = ["Plan tomorrow's top three tasks tonight", "Batch small errands together", "Review urgent items daily"]
+            if "Plain text only" in prompt:
+                return summary + "\n" + "\n".join(f"- {tip}" for tip in tips)
+            return json.dumps({"summary": summary, "tips": tips})
+        if "ID " in prompt:
+            ids = re.findall(r"ID (\d+)", prompt)
+            reasoning = "Kept the urgency order: overdue and soon-due tasks first, then by priority."
+            if "ORDER:" in prompt:
+                return f"{reasoning}\nORDER: {', '.join(ids)}"
+            return json.dumps({"order": [int(i) for i in ids], "reasoning": reasoning})
+        return "OK"
+
+    def _parse(self, text: str) -> dict:
+        parsed = parse_task_text(text)
+        return {**parsed, "confidence": 0.9}
+
+    def _category(self, text: str) -> str:
+        categories: List[str] = [c.value for c in Category]
+        return categories[int(hashlib.md5(text.encode()).hexdigest(), 16) % len(categories)]
+
+
+def create_backend() -> Optional[LLMBackend]:
+    """The backend selected by settings.llm_backend, or None when it isn't configured"""
+    if settings.llm_backend == "fake":
+        logger.warning("Using the fake LLM backend - responses are synthetic")
+        return FakeBackend(
+            latency_ms=settings.fake_llm_latency_ms,
+            latency_p99_ms=settings.fake_llm_latency_p99_ms,
+            error_rate=settings.fake_llm_error_rate,
+            seed=settings.fake_llm_seed,
+            responses_path=settings.fake_llm_responses
+        )
+
+    if settings.llm_backend != "gemini":
+        logger.error(f"Unknown LLM backend: {settings.llm_backend}")
+        return None
+
+    if not settings.gemini_api_key:
+        logger.warning("No Gemini API key configured")
+        return None
+
+    try:
+        backend = GeminiBackend(settings.gemini_api_key, settings.ai_model)
+        logger.info("Gemini AI model initialized successfully")
+        return backend
+    except Exception as e:
+        logger.error(f"Failed to initialize Gemini: {e}")
+        return None
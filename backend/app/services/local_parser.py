@@ -0,0 +1,443 @@
+"""
+Deterministic local parser for natural language task descriptions.
+
+Handles the common shapes of short task inputs without a model call:
+relative and absolute dates/times ("tomorrow at 3pm", "next Friday",
+"in 2 weeks", "EOD", "March 15"), urgency keywords for priority, keyword
+categories and title cleanup ("remind me to ..."). Each result carries a
+confidence score so callers can decide whether to escalate to the LLM.
+"""
+import re
+from datetime import MAXYEAR, MINYEAR, datetime, timedelta
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.schemas import Priority, Category
+
+
+WEEKDAYS = {
+    "monday": 0, "mon": 0, "tuesday": 1, "tue": 1, "tues": 1,
+    "wednesday": 2, "wed": 2, "thursday": 3, "thu": 3, "thur": 3, "thurs": 3,
+    "friday": 4, "fri": 4, "saturday": 5, "sat": 5, "sunday": 6, "sun": 6,
+}
+FULL_WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+# Abbreviations double as ordinary words ("sun screen", "the SAT", "c mon")
+WEEKDAY_ABBREVIATIONS = [day for day in WEEKDAYS if day not in FULL_WEEKDAYS]
+
+MONTHS = {
+    "january": 1, "jan": 1, "february": 2, "feb": 2, "march": 3, "mar": 3,
+    "april": 4, "apr": 4, "may": 5, "june": 6, "jun": 6, "july": 7, "jul": 7,
+    "august": 8, "aug": 8, "september": 9, "sep": 9, "sept": 9,
+    "october": 10, "oct": 10, "november": 11, "nov": 11, "december": 12, "dec": 12,
+}
+
+NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12,
+}
+
+# Hour used for named parts of the day and for dates given without a time
+DAY_PARTS = {"morning": 9, "noon": 12, "afternoon": 14, "evening": 18, "tonight": 20, "night": 20, "midnight": 0}
+DEFAULT_HOUR = 9
+END_OF_DAY_HOUR = 17
+
+# Confidence for guesses the LLM should double-check - below the default
+# ai_local_parse_threshold (0.85)
+UNCERTAIN_CONFIDENCE = 0.8
+
+PRIORITY_KEYWORDS = [
+    (Priority.URGENT, re.compile(r"\b(urgent(ly)?|asap|immediately|critical|emergency|right away)\b|!{2,}", re.I)),
+    (Priority.HIGH, re.compile(r"\b(important|high[ -]priority|(?<!low )(?<!low-)priority|soon)\b", re.I)),
+    (Priority.LOW, re.compile(r"\b(low[ -]priority|whenever|someday|eventually|no rush|if (i have|there'?s) time)\b", re.I)),
+]
+
+CATEGORY_KEYWORDS = [
+    (Category.FINANCE, re.compile(r"\b(pay|paid|rent|bills?|bank|tax(es)?|budget|invoices?|insurance|mortgage|loan|transfer|salary|expenses?)\b", re.I)),
+    (Category.HEALTH, re.compile(r"\b(gym|doctor|dentist|workout|exercise|run(ning)?|yoga|medication|meds|pills?|therapy|checkup|appointment with dr|walk|meditate)\b", re.I)),
+    (Category.WORK, re.compile(r"\b(meeting|report|email|client|project|presentation|deadline|boss|manager|standup|sprint|review|deploy|slides|proposal|colleague|office)\b", re.I)),
+    (Category.LEARNING, re.compile(r"\b(study|read|course|learn(ing)?|practice|homework|lesson|tutorial|exam|lecture)\b", re.I)),
+    (Category.ERRANDS, re.compile(r"\b(buy|groceries|grocery|pick up|pickup|shop(ping)?|laundry|post office|drop off|return|car wash|pharmacy|supermarket)\b", re.I)),
+    (Category.PERSONAL, re.compile(r"\b(mom|mum|dad|mother|father|family|friend|birthday|anniversary|wife|husband|kids?|date night|call|clean|home)\b", re.I)),
+]
+
+FILLER_PREFIX = re.compile(
+    r"^(?:(?:please|pls|hey|ok|okay)\s*,?\s+)*"
+    r"(?:(?:remind me|remember|don'?t forget|do not forget|i (?:need|have|want|must|should)|"
+    r"i'?ve got|need|have|make sure)\s+(?:to\s+)?|todo\s*:|to-do\s*:|task\s*:|reminder\s*:)?\s*",
+    re.I
+)
+
+TIME_PATTERN = re.compile(
+    r"(?:\b(?:at|by|before)\s+|@\s*)?\b(?:"
+    r"(?P<hour>1[0-2]|0?[1-9])(?::(?P<minute>[0-5]\d))?\s*(?P<ampm>[ap]\.?m\b\.?)"
+    r"|(?P<hour24>[01]?\d|2[0-3]):(?P<minute24>[0-5]\d)(?![\d:]))",
+    re.I
+)
+AT_HOUR_PATTERN = re.compile(r"\bat\s+(?P<hour>\d{1,2})(?:\s*o'?clock)?\b(?!\s*(?:/|-|%|[a-z]))", re.I)
+DAY_PART_PATTERN = re.compile(r"\b(?:in the |this |tomorrow )?(?P<part>morning|noon|afternoon|evening|tonight|night|midnight)\b", re.I)
+
+EOD_PATTERN = re.compile(r"\b(?:by\s+)?(?:eod|end of (?:the )?day|cob|close of business)\b", re.I)
+EOW_PATTERN = re.compile(r"\b(?:by\s+)?(?:eow|end of (?:the )?week)\b", re.I)
+EOM_PATTERN = re.compile(r"\b(?:by\s+)?(?:eom|end of (?:the )?month)\b", re.I)
+RELATIVE_DAY_PATTERN = re.compile(r"\b(?:by\s+|on\s+)?(?P<day>today|tonight|day after tomorrow|tomorrow|tmrw|tmr)\b", re.I)
+IN_DURATION_PATTERN = re.compile(
+    r"\b(?:in|within)\s+(?P<count>\d+|" + "|".join(NUMBER_WORDS) + r")\s+"
+    r"(?P<unit>minutes?|mins?|hours?|hrs?|days?|weeks?|months?)\b",
+    re.I
+)
+WEEKDAY_PATTERN = re.compile(
+    r"\b(?:(?:on|by|due|before)\s+)?(?P<modifier>this|next|coming)?\s*(?P<weekday>" +
+    "|".join(FULL_WEEKDAYS) + r")\b\.?",
+    re.I
+)
+# Abbreviations only count after a date preposition or modifier, or as the
+# last word (unless it follows an article - "the SAT")
+WEEKDAY_ABBREVIATION_PATTERN = re.compile(
+    r"\b(?:(?:(?:on|by|due|before)\s+)?(?P<modifier>this|next|coming)\s+|(?:on|by|due|before)\s+|(?<!\bthe\s)(?<!\ba\s)(?<!\ban\s)(?<!\bmy\s)(?=\w+\.?\s*$))"
+    r"(?P<weekday>" + "|".join(sorted(WEEKDAY_ABBREVIATIONS, key=len, reverse=True)) + r")\b\.?",
+    re.I
+)
+NEXT_PERIOD_PATTERN = re.compile(r"\b(?:by\s+)?(?P<modifier>next|this)\s+(?P<period>week|weekend|month)\b|\b(?:on\s+the\s+|this\s+)?weekend\b", re.I)
+ISO_DATE_PATTERN = re.compile(r"\b(?:on\s+|by\s+)?(?P<year>\d{4})-(?P<month>\d{1,2})-(?P<day>\d{1,2})\b")
+# n/m is as often a fraction ("2/3 of budget") - only a date after a date
+# preposition or as the last word
+SLASH_DATE_PATTERN = re.compile(
+    r"\b(?:(?:on|by|due|before)\s+|(?=\d{1,2}/\d{1,2}(?:/\d{2,4})?\.?\s*$))"
+    r"(?P<month>\d{1,2})/(?P<day>\d{1,2})(?:/(?P<year>\d{2,4}))?\b"
+)
+_MONTH_NAMES = "|".join(sorted(MONTHS, key=len, reverse=True))
+MONTH_DAY_PATTERN = re.compile(
+    r"\b(?:on\s+|by\s+)?(?:(?P<month>" + _MONTH_NAMES + r")\.?\s+(?P<day>\d{1,2})(?:st|nd|rd|th)?"
+    r"|(?:the\s+)?(?P<day2>\d{1,2})(?:st|nd|rd|th)?\s+(?:of\s+)?(?P<month2>" + _MONTH_NAMES + r")\.?)"
+    r"(?:,?\s+(?P<year>\d{4}))?\b",
+    re.I
+)
+
+# Temporal words still present after extraction mean we missed something
+UNRESOLVED_TEMPORAL = re.compile(
+    r"\b(today|tomorrow|tonight|yesterday|next|last|week|weekend|month|year|morning|evening|afternoon|"
+    r"noon|midnight|o'?clock|until|till|after|before|later|\d{1,2}(st|nd|rd|th)|\d+\s*(am|pm)|"
+    + "|".join(FULL_WEEKDAYS) + "|" + "|".join(m for m in MONTHS if m != "may") + r")\b",
+    re.I
+)
+TRAILING_CONNECTORS = re.compile(r"(?:\s+\b(?:by|on|at|due|before|until|for|in|the|and)\b)+\s*$", re.I)
+LEADING_CONNECTORS = re.compile(r"^\s*(?:\b(?:by|on|at|due|to)\b\s+)+", re.I)
+PUNCTUATION_RUNS = re.compile(r"\s*[,;:\-–]+\s*(?=[,;:\-–]|$)|^\s*[,;:\-–!]+\s*")
+SPACES = re.compile(r"\s{2,}")
+
+MAX_TITLE_LENGTH = 100
+
+
+def parse_task_text(
+    text: str,
+    now: Optional[datetime] = None,
+    classify: Optional[Callable[[str], Optional[str]]] = None
+) -> Dict[str, Any]:
+    """
+    Parse a natural language task description without calling the LLM.
+
+    Returns the same shape as AIService.parse_natural_language, with a
+    confidence score reflecting how completely the input was understood.
+    classify(title) may supply a category when no keyword matches.
+    """
+    now = now or datetime.now()
+    remaining = " ".join(text.split())
+
+    priority, remaining = _extract_priority(remaining)
+    due_date, remaining, weak_date = _extract_due_date(remaining, now)
+    title = _clean_title(remaining)
+    category, ambiguous = _match_category(text)
+    if category == Category.OTHER and classify and title:
+        category = Category(classify(title) or Category.OTHER.value)
+
+    confidence = _score(text, title, category)
+    if weak_date or ambiguous:
+        confidence = min(confidence, UNCERTAIN_CONFIDENCE)
+
+    return {
+        "title": (title or text.strip())[:MAX_TITLE_LENGTH],
+        "description": None,
+        "priority": priority.value,
+        "category": category.value,
+        "due_date": due_date.isoformat(timespec="seconds") if due_date else None,
+        "confidence": confidence,
+    }
+
+
+def _extract_priority(text: str) -> Tuple[Priority, str]:
+    """Find the strongest urgency keyword and strip it from the text"""
+    for priority, pattern in PRIORITY_KEYWORDS:
+        if pattern.search(text):
+            return priority, pattern.sub(" ", text)
+    return Priority.MEDIUM, text
+
+
+def _match_category(text: str) -> Tuple[Category, bool]:
+    """
+    Category with the most keyword hits (earlier categories win ties), else
+    OTHER, and whether keywords of other categories matched too.
+    """
+    hits = [(len(pattern.findall(text)), category) for category, pattern in CATEGORY_KEYWORDS]
+    matched = [(count, category) for count, category in hits if count]
+    if not matched:
+        return Category.OTHER, False
+    best = max(matched, key=lambda hit: hit[0])[1]
+    return best, len(matched) > 1
+
+
+def _extract_due_date(text: str, now: datetime) -> Tuple[Optional[datetime], str, bool]:
+    """
+    Resolve date and time expressions, returning the due date, the leftover
+    text and whether the date rests only on a weekday abbreviation
+    """
+    date: Optional[datetime] = None
+    weak = False
+    hour: Optional[int] = None
+    minute = 0
+
+    # Fixed-time shorthands carry both a date and a time
+    for pattern, resolve in (
+        (EOD_PATTERN, lambda m: now),
+        (EOW_PATTERN, lambda m: now + timedelta(days=(4 - now.weekday()) % 7)),
+        (EOM_PATTERN, lambda m: _end_of_month(now)),
+    ):
+        match = pattern.search(text)
+        if match:
+            date, hour = resolve(match), END_OF_DAY_HOUR
+            text = _cut(text, match)
+            break
+
+    match = IN_DURATION_PATTERN.search(text)
+    out_of_range = False
+    if match and date is None:
+        count = match.group("count").lower()
+        count = int(count) if count.isdigit() else NUMBER_WORDS[count]
+        unit = match.group("unit").lower()
+        try:
+            if unit.startswith(("minute", "min")):
+                date = now + timedelta(minutes=count)
+                hour, minute = date.hour, date.minute
+            elif unit.startswith(("hour", "hr")):
+                date = now + timedelta(hours=count)
+                hour, minute = date.hour, date.minute
+            elif unit.startswith("day"):
+                date = now + timedelta(days=count)
+            elif unit.startswith("week"):
+                date = now + timedelta(weeks=count)
+            else:
+                date = _add_months(now, count)
+            text = _cut(text, match)
+        except (OverflowError, ValueError):
+            # Past the calendar's range - no date, and let the LLM judge it
+            out_of_range = True
+
+    if date is None:
+        date, text, weak = _extract_calendar_date(text, now)
+    weak = weak or out_of_range
+
+    # Time of day
+    if hour is None:
+        match = TIME_PATTERN.search(text)
+        if match:
+            hour, minute = _time_from_match(match)
+            text = _cut(text, match)
+        else:
+            match = AT_HOUR_PATTERN.search(text)
+            if match and 1 <= int(match.group("hour")) <= 12:
+                hour = int(match.group("hour"))
+                # "at 3" almost always means the afternoon for tasks
+                if hour < 8:
+                    hour += 12
+                text = _cut(text, match)
+
+    match = DAY_PART_PATTERN.search(text)
+    if match:
+        part_hour = DAY_PARTS[match.group("part").lower()]
+        if hour is None:
+            hour = part_hour
+        elif hour < 12 and part_hour >= 14:
+            hour += 12
+        if match.group("part").lower() in ("tonight",) and date is None:
+            date = now
+        text = _cut(text, match)
+
+    if date is None and hour is None:
+        return None, text, weak
+
+    if date is None:
+        # A bare time means the next occurrence of it
+        date = now
+        if (hour, minute) <= (now.hour, now.minute):
+            date = now + timedelta(days=1)
+
+    if hour is None:
+        hour = DEFAULT_HOUR
+
+    return date.replace(hour=hour, minute=minute, second=0, microsecond=0), text, weak
+
+
+def _extract_calendar_date(text: str, now: datetime) -> Tuple[Optional[datetime], str, bool]:
+    """Relative days, weekdays, next week/month and absolute dates, and whether it came from an abbreviation"""
+    date, text = _extract_named_date(text, now)
+    if date is not None:
+        return date, text, False
+
+    match = WEEKDAY_ABBREVIATION_PATTERN.search(text)
+    if match:
+        return _weekday_date(match, now), _cut(text, match), True
+    return None, text, False
+
+
+def _weekday_date(match: "re.Match", now: datetime) -> datetime:
+    """Date of the weekday in a WEEKDAY_PATTERN / WEEKDAY_ABBREVIATION_PATTERN match"""
+    target = WEEKDAYS[match.group("weekday").lower()]
+    days_ahead = (target - now.weekday()) % 7 or 7
+    # "next Friday" said early in the week means the one after this week's
+    if (match.group("modifier") or "").lower() == "next" and now.weekday() < target:
+        days_ahead += 7
+    return now + timedelta(days=days_ahead)
+
+
+def _extract_named_date(text: str, now: datetime) -> Tuple[Optional[datetime], str]:
+    """Dates written out in full (everything but weekday abbreviations)"""
+    match = RELATIVE_DAY_PATTERN.search(text)
+    if match:
+        day = match.group("day").lower()
+        offset = {"today": 0, "tonight": 0, "tomorrow": 1, "tmrw": 1, "tmr": 1, "day after tomorrow": 2}[day]
+        text = _cut(text, match, keep="tonight" if day == "tonight" else "")
+        return now + timedelta(days=offset), text
+
+    match = WEEKDAY_PATTERN.search(text)
+    if match:
+        return _weekday_date(match, now), _cut(text, match)
+
+    match = NEXT_PERIOD_PATTERN.search(text)
+    if match:
+        period = (match.group("period") or "weekend").lower()
+        modifier = (match.group("modifier") or "this").lower()
+        if period == "week":
+            days_ahead = 7 - now.weekday() if modifier == "next" else (4 - now.weekday()) % 7
+            return now + timedelta(days=days_ahead), _cut(text, match)
+        if period == "weekend":
+            days_ahead = (5 - now.weekday()) % 7
+            if modifier == "next":
+                days_ahead += 7
+            return now + timedelta(days=days_ahead), _cut(text, match)
+        first_of_month = _add_months(now, 1 if modifier == "next" else 0).replace(day=1)
+        return (first_of_month if modifier == "next" else _end_of_month(now)), _cut(text, match)
+
+    match = ISO_DATE_PATTERN.search(text)
+    if match:
+        date = _safe_date(now, int(match.group("year")), int(match.group("month")), int(match.group("day")))
+        if date:
+            return date, _cut(text, match)
+
+    match = MONTH_DAY_PATTERN.search(text)
+    if match:
+        month = MONTHS[(match.group("month") or match.group("month2")).lower()]
+        day = int(match.group("day") or match.group("day2"))
+        year = int(match.group("year")) if match.group("year") else None
+        date = _resolve_month_day(now, month, day, year)
+        if date:
+            return date, _cut(text, match)
+
+    match = SLASH_DATE_PATTERN.search(text)
+    if match:
+        year = match.group("year")
+        if year:
+            year = _full_year(now, year)
+        date = _resolve_month_day(now, int(match.group("month")), int(match.group("day")), year)
+        if date:
+            return date, _cut(text, match)
+
+    return None, text
+
+
+def _time_from_match(match: "re.Match") -> Tuple[int, int]:
+    """Hour and minute from a TIME_PATTERN match"""
+    if match.group("hour24") is not None:
+        return int(match.group("hour24")), int(match.group("minute24"))
+
+    hour = int(match.group("hour")) % 12
+    minute = int(match.group("minute") or 0)
+    if match.group("ampm").lower().startswith("p"):
+        hour += 12
+    return hour, min(minute, 59)
+
+
+def _resolve_month_day(now: datetime, month: int, day: int, year: Optional[int]) -> Optional[datetime]:
+    """Date for month/day, rolling into next year when no year is given and it has passed"""
+    if year is not None:
+        return _safe_date(now, year, month, day)
+    date = _safe_date(now, now.year, month, day)
+    if date and date.date() < now.date():
+        date = _safe_date(now, now.year + 1, month, day)
+    return date
+
+
+def _full_year(now: datetime, year: str) -> int:
+    """Four-digit year; two digits mean the nearest such year to now"""
+    if len(year) != 2:
+        return int(year)
+    candidate = now.year - now.year % 100 + int(year)
+    return min((candidate - 100, candidate, candidate + 100), key=lambda y: abs(y - now.year))
+
+
+def _safe_date(now: datetime, year: int, month: int, day: int) -> Optional[datetime]:
+    """now with the given calendar date, or None if the date is invalid"""
+    try:
+        return now.replace(year=year, month=month, day=day)
+    except ValueError:
+        return None
+
+
+def _add_months(date: datetime, months: int) -> datetime:
+    """Same day-of-month N months later, clamped to the month's length"""
+    month_index = date.month - 1 + months
+    year, month = date.year + month_index // 12, month_index % 12 + 1
+    if not MINYEAR <= year <= MAXYEAR:
+        raise OverflowError("date value out of range")
+    for day in (date.day, 30, 29, 28):
+        try:
+            return date.replace(year=year, month=month, day=day)
+        except ValueError:
+            continue
+    return date
+
+
+def _end_of_month(date: datetime) -> datetime:
+    """Last day of date's month"""
+    return _add_months(date.replace(day=1), 1) - timedelta(days=1)
+
+
+def _cut(text: str, match: "re.Match", keep: str = "") -> str:
+    """Remove a matched span from the text, optionally leaving a word behind"""
+    return f"{text[:match.start()]} {keep} {text[match.end():]}"
+
+
+def _clean_title(text: str) -> str:
+    """Strip filler phrases, dangling connectors and stray punctuation"""
+    title = SPACES.sub(" ", text).strip()
+    title = FILLER_PREFIX.sub("", title, count=1)
+    title = LEADING_CONNECTORS.sub("", title)
+    title = PUNCTUATION_RUNS.sub("", title)
+    for _ in range(2):
+        title = TRAILING_CONNECTORS.sub("", title).strip(" ,;:-–.!")
+    title = SPACES.sub(" ", title).strip()
+    return title[:1].upper() + title[1:]
+
+
+def _score(text: str, title: str, category: Category) -> float:
+    """Heuristic confidence that the local parse matches what the LLM would produce"""
+    if not title:
+        return 0.3
+
+    confidence = 0.95
+    if len(text.split()) > 12:
+        confidence -= 0.25
+    if len(title) > 60:
+        confidence -= 0.1
+    if category == Category.OTHER:
+        confidence -= 0.15
+    if UNRESOLVED_TEMPORAL.search(title):
+        confidence = min(confidence, 0.5)
+    return round(max(min(confidence, 1.0), 0.0), 2)
@@ -0,0 +1,117 @@
+"""
+Keyset (cursor) pagination over (created_at, id), and row counts for listings
+"""
+import base64
+import json
+import logging
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import func, text, tuple_
+from sqlalchemy.orm import Query
+
+from app.config import settings
+from app.models import Task
+
+logger = logging.getLogger(__name__)
+
+NEXT = "next"
+PREV = "prev"
+
+
+def encode_cursor(task: Task, direction: str) -> str:
+    """Opaque cursor pointing just past task in the given direction"""
+    raw = json.dumps({"c": task.created_at.isoformat(), "i": task.id, "d": direction}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int, str]:
+    """(created_at, id, direction) from a cursor; ValueError when it is malformed"""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        created_at, task_id, direction = datetime.fromisoformat(data["c"]), int(data["i"]), data["d"]
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("Invalid cursor") from None
+    if direction not in (NEXT, PREV):
+        raise ValueError(f"Invalid cursor direction: {direction}")
+    return created_at, task_id, direction
+
+
+def keyset_page(query: Query, cursor: Optional[str], limit: int) -> Tuple[List[Task], Optional[str], Optional[str]]:
+    """
+    One page of query, newest first, plus its (next_cursor, prev_cursor).
+
+    Seeks with a row-value comparison on (created_at, id), which the
+    composite index serves directly, so every page costs the same however
+    deep it is, and rows inserted meanwhile don't shift the pages. One extra
+    row is fetched to tell whether more pages follow. The filters must be
+    the same on every request of a walk; the cursor only holds a position.
+    """
+    key = tuple_(Task.created_at, Task.id)
+
+    if cursor is None:
+        rows = query.order_by(Task.created_at.desc(), Task.id.desc()).limit(limit + 1).all()
+        tasks = rows[:limit]
+        more_after, more_before = len(rows) > limit, False
+    else:
+        created_at, task_id, direction = decode_cursor(cursor)
+        if direction == NEXT:
+            rows = (
+                query.filter(key < (created_at, task_id))
+                .order_by(Task.created_at.desc(), Task.id.desc())
+                .limit(limit + 1)
+                .all()
+            )
+            tasks = rows[:limit]
+            more_after, more_before = len(rows) > limit, True
+        else:
+            # Walk backwards in ascending order, then flip the page back
+            rows = (
+                query.filter(key > (created_at, task_id))
+                .order_by(Task.created_at.asc(), Task.id.asc())
+                .limit(limit + 1)
+                .all()
+            )
+            tasks = rows[:limit][::-1]
+            more_after, more_before = True, len(rows) > limit
+
+    if not tasks:
+        return tasks, None, None
+    next_cursor = encode_cursor(tasks[-1], NEXT) if more_after else None
+    prev_cursor = encode_cursor(tasks[0], PREV) if more_before else None
+    return tasks, next_cursor, prev_cursor
+
+
+def planner_estimate(query: Query) -> Optional[int]:
+    """PostgreSQL's row estimate for query (no rows are read), or None elsewhere"""
+    bind = query.session.get_bind()
+    if bind.dialect.name != "postgresql":
+        return None
+    try:
+        sql = query.statement.compile(dialect=bind.dialect, compile_kwargs={"literal_binds": True})
+        # A savepoint, so a failed EXPLAIN doesn't abort the request's transaction
+        with query.session.begin_nested():
+            plan = query.session.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+    except Exception as e:
+        logger.error(f"Row estimate failed: {e}")
+        return None
+
+
+def count_rows(query: Query, exact: bool = True) -> Tuple[int, bool]:
+    """
+    (count, is_exact) for the rows of query.
+
+    With exact=False a planner estimate is used when the database offers
+    one and it is at least task_count_estimate_min - large counts are where
+    COUNT(*) is a full scan, and where being a little off doesn't matter.
+    """
+    if not exact:
+        estimate = planner_estimate(query)
+        if estimate is not None and estimate >= settings.task_count_estimate_min:
+            return estimate, False
+    # count(*) over just the filter, which an index can answer, rather
+    # than over a subquery of full rows
+    return query.order_by(None).with_entities(func.count(Task.id)).scalar(), True
@@ -0,0 +1,149 @@
+"""
+Persistent AI result cache stored in the application database
+"""
+import asyncio
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Optional
+
+from app.database import SessionLocal
+from app.models import AICacheEntry
+
+logger = logging.getLogger(__name__)
+
+
+class PersistentCache:
+    """
+    Cross-worker AI result cache backed by the ai_cache table.
+
+    Entries are keyed by a hash of namespace + canonical prompt key and by
+    model name, so switching models never serves stale results. Database
+    work runs off the event loop, and cache errors are logged and treated as
+    misses - the cache never breaks an AI call.
+    """
+
+    def __init__(self, model: str, ttl_seconds: int, enabled: bool = True):
+        self.model = model
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self._sweeper: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evicted = 0
+
+    @staticmethod
+    def _hash(namespace: str, key: str) -> str:
+        return hashlib.sha256(f"{namespace}\x00{key}".encode()).hexdigest()
+
+    async def get(self, namespace: str, key: str) -> Optional[Any]:
+        """Cached value, or None on a miss"""
+        return (await self.get_many(namespace, [key])).get(key)
+
+    async def get_many(self, namespace: str, keys: Iterable[str]) -> Dict[str, Any]:
+        """Cached values for the keys that are present, in one query"""
+        keys = list(keys)
+        if not self.enabled or not keys:
+            return {}
+
+        hashes = {self._hash(namespace, key): key for key in keys}
+        try:
+            rows = await asyncio.to_thread(self._load, list(hashes))
+        except Exception as e:
+            logger.warning(f"AI cache read failed: {e}")
+            return {}
+
+        found = {hashes[key_hash]: json.loads(value) for key_hash, value in rows}
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    async def set(self, namespace: str, key: str, value: Any):
+        """Store a value for ttl_seconds"""
+        if not self.enabled:
+            return
+        try:
+            await asyncio.to_thread(self._store, self._hash(namespace, key), json.dumps(value))
+            self.writes += 1
+        except Exception as e:
+            logger.warning(f"AI cache write failed: {e}")
+
+    def _load(self, key_hashes):
+        db = SessionLocal()
+        try:
+            return (
+                db.query(AICacheEntry.key_hash, AICacheEntry.value)
+                .filter(
+                    AICacheEntry.key_hash.in_(key_hashes),
+                    AICacheEntry.model == self.model,
+                    AICacheEntry.expires_at > datetime.utcnow()
+                )
+                .all()
+            )
+        finally:
+            db.close()
+
+    def _store(self, key_hash: str, value: str):
+        db = SessionLocal()
+        try:
+            db.merge(AICacheEntry(
+                key_hash=key_hash,
+                model=self.model,
+                value=value,
+                expires_at=datetime.utcnow() + timedelta(seconds=self.ttl_seconds),
+                created_at=datetime.utcnow()
+            ))
+            db.commit()
+        finally:
+            db.close()
+
+    def sweep(self) -> int:
+        """Delete expired entries; returns how many were removed"""
+        db = SessionLocal()
+        try:
+            deleted = (
+                db.query(AICacheEntry)
+                .filter(AICacheEntry.expires_at <= datetime.utcnow())
+                .delete(synchronize_session=False)
+            )
+            db.commit()
+            self.evicted += deleted
+            return deleted
+        finally:
+            db.close()
+
+    def start_sweeper(self, interval: float):
+        """Start the background eviction loop"""
+        if self.enabled and self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._sweep_loop(interval))
+
+    async def _sweep_loop(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                deleted = await asyncio.to_thread(self.sweep)
+                if deleted:
+                    logger.info(f"Evicted {deleted} expired AI cache entries")
+            except Exception as e:
+                logger.error(f"AI cache sweep failed: {e}")
+
+    async def stop(self):
+        """Stop the background eviction loop"""
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            await asyncio.gather(self._sweeper, return_exceptions=True)
+            self._sweeper = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss/write counters for this worker"""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "writes": self.writes,
+            "evicted": self.evicted
+        }
@@ -0,0 +1,98 @@
+"""
+Deterministic local task prioritization
+"""
+import heapq
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+# Relative importance of the stored priority and category
+PRIORITY_WEIGHTS = {"urgent": 4.0, "high": 3.0, "medium": 2.0, "low": 1.0}
+CATEGORY_WEIGHTS = {
+    "work": 1.0,
+    "finance": 1.0,
+    "health": 0.9,
+    "errands": 0.7,
+    "personal": 0.6,
+    "learning": 0.6,
+    "other": 0.5
+}
+
+
+def _as_utc(value: Any) -> Optional[datetime]:
+    """Naive UTC datetime from a datetime or ISO string, or None"""
+    if not value:
+        return None
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def score_task(task: Dict, now: Optional[datetime] = None) -> float:
+    """
+    Urgency score for one task ({"priority", "category", "due_date", "created_at"}).
+
+    Overdue tasks score highest and keep climbing for two weeks; upcoming
+    due dates add urgency that halves roughly with each extra day left.
+    The stored priority dominates undated tasks, category nudges ties, and
+    age slowly lifts tasks that have been waiting.
+    """
+    now = now or datetime.utcnow()
+    score = PRIORITY_WEIGHTS.get(task.get("priority"), 2.0) * 10
+    score += CATEGORY_WEIGHTS.get(task.get("category"), 0.5) * 5
+
+    due = _as_utc(task.get("due_date"))
+    if due is not None:
+        days_left = (due - now).total_seconds() / 86400
+        if days_left < 0:
+            score += 40 + min(-days_left, 14) * 2
+        else:
+            score += 30 / (1 + days_left)
+
+    created = _as_utc(task.get("created_at"))
+    if created is not None:
+        score += min(max((now - created).total_seconds() / 86400, 0), 30) * 0.3
+
+    return round(score, 2)
+
+
+def rank_tasks(tasks: List[Dict], limit: Optional[int] = None, now: Optional[datetime] = None) -> List[Dict]:
+    """
+    Tasks ordered by score, highest first, each with a "score" added.
+
+    With limit, only the top tasks are selected (heap, O(n log k)). Equal
+    scores keep their input order.
+    """
+    now = now or datetime.utcnow()
+    scored = ((score_task(task, now), -i, task) for i, task in enumerate(tasks))
+    if limit is not None and limit < len(tasks):
+        top = heapq.nlargest(limit, scored, key=lambda item: item[:2])
+    else:
+        top = sorted(scored, key=lambda item: item[:2], reverse=True)
+    return [{**task, "score": score} for score, _, task in top]
+
+
+def explain_ranking(ranked: List[Dict], now: Optional[datetime] = None) -> str:
+    """Short deterministic explanation of a local ranking"""
+    if not ranked:
+        return "No open tasks to prioritize"
+
+    now = now or datetime.utcnow()
+    overdue = due_soon = 0
+    for task in ranked:
+        due = _as_utc(task.get("due_date"))
+        if due is not None and due < now:
+            overdue += 1
+        elif due is not None and (due - now).total_seconds() < 86400:
+            due_soon += 1
+
+    parts = ["Ranked by due date, overdue status, priority, category and age"]
+    if overdue:
+        parts.append(f"{overdue} overdue")
+    if due_soon:
+        parts.append(f"{due_soon} due within 24 hours")
+    return "; ".join(parts) + f". Start with \"{ranked[0]['title']}\"."
@@ -0,0 +1,85 @@
+"""
+Prompt size budgeting and context compaction
+"""
+import logging
+import re
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Tuple, TypeVar
+
+from app.services.rate_limit import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def truncate(text: str, max_tokens: int) -> str:
+    """Shorten text to about max_tokens, cutting at a word boundary"""
+    if not text or estimate_tokens(text) <= max_tokens:
+        return text
+    cut = text[:max_tokens * 4].rsplit(" ", 1)[0] or text[:max_tokens * 4]
+    return cut.rstrip(" ,.;:-") + "..."
+
+
+def title_key(title: str) -> str:
+    """Case-, punctuation- and whitespace-insensitive form of a title"""
+    return " ".join(WORD_PATTERN.findall(title.lower()))
+
+
+def dedupe(items: Iterable[T], key: Callable[[T], str]) -> List[Tuple[T, List[T]]]:
+    """
+    Group near-identical items (same title_key) in first-seen order.
+
+    Returns (representative, duplicates) pairs.
+    """
+    groups: Dict[str, Tuple[T, List[T]]] = {}
+    for item in items:
+        normalized = title_key(key(item))
+        if normalized in groups:
+            groups[normalized][1].append(item)
+        else:
+            groups[normalized] = (item, [])
+    return list(groups.values())
+
+
+def fit(lines: Iterable[str], max_tokens: int) -> List[str]:
+    """Leading lines that fit in max_tokens (the first line always fits)"""
+    kept, used = [], 0
+    for line in lines:
+        tokens = estimate_tokens(line)
+        if kept and used + tokens > max_tokens:
+            break
+        kept.append(line)
+        used += tokens
+    return kept
+
+
+class PromptMeter:
+    """Per-kind prompt token counters for /ai/status"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._kinds: Dict[str, Dict[str, int]] = {}
+
+    def record(self, kind: str, tokens: int):
+        """Count one prompt of kind with an estimated size of tokens"""
+        logger.debug(f"AI prompt {kind}: ~{tokens} tokens")
+        with self._lock:
+            counters = self._kinds.setdefault(kind, {"calls": 0, "tokens": 0, "max_tokens": 0})
+            counters["calls"] += 1
+            counters["tokens"] += tokens
+            counters["max_tokens"] = max(counters["max_tokens"], tokens)
+
+    def stats(self) -> Dict[str, Any]:
+        """Calls, average and largest prompt per kind"""
+        with self._lock:
+            return {
+                kind: {
+                    "calls": c["calls"],
+                    "avg_tokens": round(c["tokens"] / c["calls"]),
+                    "max_tokens": c["max_tokens"]
+                }
+                for kind, c in self._kinds.items()
+            }
@@ -0,0 +1,159 @@
+"""
+Client-side rate limiting and daily quota for AI provider calls
+"""
+import asyncio
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a call would have to wait too long for rate limit capacity"""
+
+
+class QuotaExceeded(Exception):
+    """Raised when the daily AI budget is used up"""
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for a prompt (~4 characters per token)"""
+    return max(len(text) // 4, 1)
+
+
+class TokenBucket:
+    """
+    Token bucket that hands out reservations.
+
+    Callers reserve capacity up front (the balance may go negative) and then
+    sleep until their reservation is covered, which keeps waiting callers
+    in arrival order.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until amount would be available"""
+        self._refill()
+        deficit = amount - self._tokens
+        return deficit / self.rate if deficit > 0 else 0.0
+
+    def reserve(self, amount: float):
+        self._refill()
+        self._tokens -= amount
+
+    def refund(self, amount: float):
+        self._refill()
+        self._tokens = min(self.capacity, self._tokens + amount)
+
+
+class RateLimiter:
+    """Requests-per-second and tokens-per-minute limits shared by all AI calls"""
+
+    def __init__(self, requests_per_second: float, burst: int, tokens_per_minute: int, max_wait: float):
+        self.max_wait = max_wait
+        self._requests = TokenBucket(requests_per_second, max(burst, 1)) if requests_per_second > 0 else None
+        self._tokens = TokenBucket(tokens_per_minute / 60, tokens_per_minute) if tokens_per_minute > 0 else None
+        self.queued = 0
+        self.shed = 0
+
+    async def acquire(self, tokens: int):
+        """Wait (at most max_wait) for capacity for one call; raises RateLimitExceeded otherwise"""
+        buckets = [(b, n) for b, n in ((self._requests, 1), (self._tokens, tokens)) if b is not None]
+        if not buckets:
+            return
+
+        wait = max(bucket.wait_time(amount) for bucket, amount in buckets)
+        if wait > self.max_wait:
+            self.shed += 1
+            raise RateLimitExceeded(f"AI rate limit reached (would wait {wait:.1f}s)")
+
+        for bucket, amount in buckets:
+            bucket.reserve(amount)
+
+        if wait > 0:
+            self.queued += 1
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                for bucket, amount in buckets:
+                    bucket.refund(amount)
+                raise
+
+    def stats(self) -> Dict[str, Any]:
+        """Queueing and load-shedding counters"""
+        return {"queued": self.queued, "shed": self.shed}
+
+
+class DailyQuota:
+    """
+    Per-process daily budget of requests and estimated tokens.
+
+    Counters reset at midnight UTC. A limit of 0 means unlimited.
+    """
+
+    def __init__(self, max_requests: int, max_tokens: int):
+        self.max_requests = max_requests
+        self.max_tokens = max_tokens
+        self._lock = threading.Lock()
+        self._day = self._today()
+        self.requests = 0
+        self.tokens = 0
+
+    @staticmethod
+    def _today():
+        return datetime.now(timezone.utc).date()
+
+    def _roll_over(self):
+        today = self._today()
+        if today != self._day:
+            self._day = today
+            self.requests = 0
+            self.tokens = 0
+
+    def exhausted(self) -> bool:
+        """True once either budget is used up for today"""
+        with self._lock:
+            self._roll_over()
+            return (
+                (self.max_requests > 0 and self.requests >= self.max_requests)
+                or (self.max_tokens > 0 and self.tokens >= self.max_tokens)
+            )
+
+    def consume(self, tokens: int):
+        """Charge one call against today's budget; raises QuotaExceeded if it doesn't fit"""
+        with self._lock:
+            self._roll_over()
+            if self.max_requests > 0 and self.requests + 1 > self.max_requests:
+                raise QuotaExceeded("Daily AI request budget exhausted")
+            if self.max_tokens > 0 and self.tokens + tokens > self.max_tokens:
+                raise QuotaExceeded("Daily AI token budget exhausted")
+            self.requests += 1
+            self.tokens += tokens
+
+    def refund(self, tokens: int):
+        """Give back a charge for a call that never reached the provider"""
+        with self._lock:
+            self.requests = max(self.requests - 1, 0)
+            self.tokens = max(self.tokens - tokens, 0)
+
+    def stats(self) -> Dict[str, Any]:
+        """Today's usage against the budget"""
+        with self._lock:
+            self._roll_over()
+            return {
+                "day": self._day.isoformat(),
+                "requests": self.requests,
+                "max_requests": self.max_requests or None,
+                "tokens": self.tokens,
+                "max_tokens": self.max_tokens or None
+            }
@@ -0,0 +1,177 @@
+"""
+Priority-aware scheduling of outbound AI calls
+"""
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import Any, Deque, Dict, Optional
+
+
+class AIPriority(IntEnum):
+    """Priority classes for AI work, most urgent first"""
+    INTERACTIVE = 0  # a user is waiting on the result (/ai/parse)
+    STANDARD = 1  # semi-interactive (/ai/prioritize, /ai/insights, /ai/categorize)
+    BULK = 2  # background jobs (backfill, enrichment, batch imports)
+
+
+class SchedulerRejected(Exception):
+    """Raised when a call is refused because its queue is full or its deadline passed"""
+
+
+class ClassLimits:
+    """Scheduling limits for one priority class"""
+
+    __slots__ = ("max_running", "max_queued", "max_wait")
+
+    def __init__(self, max_running: int, max_queued: int, max_wait: Optional[float]):
+        self.max_running = max(max_running, 1)
+        self.max_queued = max_queued
+        self.max_wait = max_wait if max_wait and max_wait > 0 else None
+
+
+class _Waiter:
+    __slots__ = ("future", "deadline", "enqueued")
+
+    def __init__(self, future: asyncio.Future, deadline: Optional[float]):
+        self.future = future
+        self.deadline = deadline
+        self.enqueued = time.monotonic()
+
+
+class _ClassStats:
+    __slots__ = ("running", "admitted", "rejected", "expired", "total_wait", "max_wait")
+
+    def __init__(self):
+        self.running = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.expired = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+
+class AIScheduler:
+    """
+    Admit AI calls into a fixed number of slots by priority class.
+
+    A free slot always goes to the most urgent class that has a waiter and
+    is below its own concurrency share, so bulk work can never hold more
+    than its share and never delays an interactive call that is queued.
+    Each class has a queue-depth limit (excess calls are rejected at once)
+    and a maximum queueing time (calls that would start too late to be
+    useful are dropped).
+    """
+
+    def __init__(self, capacity: int, limits: Dict[AIPriority, ClassLimits]):
+        self.capacity = max(capacity, 1)
+        self.limits = limits
+        self._running = 0
+        self._queues: Dict[AIPriority, Deque[_Waiter]] = {p: deque() for p in AIPriority}
+        self._stats: Dict[AIPriority, _ClassStats] = {p: _ClassStats() for p in AIPriority}
+
+    @asynccontextmanager
+    async def slot(self, priority: AIPriority):
+        """Hold one call slot for the duration of the block"""
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release(priority)
+
+    def _has_room(self, priority: AIPriority) -> bool:
+        return (
+            self._running < self.capacity
+            and self._stats[priority].running < self.limits[priority].max_running
+        )
+
+    async def acquire(self, priority: AIPriority):
+        """Wait for a slot; raises SchedulerRejected if the queue is full or the wait too long"""
+        stats = self._stats[priority]
+        limits = self.limits[priority]
+
+        # Fast path: room available and nobody at this priority or above is queued
+        if self._has_room(priority) and not any(self._queues[p] for p in AIPriority if p <= priority):
+            self._grant(priority, 0.0)
+            return
+
+        queue = self._queues[priority]
+        if len(queue) >= limits.max_queued:
+            stats.rejected += 1
+            raise SchedulerRejected(f"AI {priority.name.lower()} queue is full")
+
+        loop = asyncio.get_running_loop()
+        deadline = time.monotonic() + limits.max_wait if limits.max_wait else None
+        waiter = _Waiter(loop.create_future(), deadline)
+        queue.append(waiter)
+
+        try:
+            await asyncio.wait_for(waiter.future, timeout=limits.max_wait)
+        except asyncio.TimeoutError:
+            self._discard(priority, waiter)
+            stats.expired += 1
+            raise SchedulerRejected(f"AI {priority.name.lower()} call waited past its deadline") from None
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled() and waiter.future.exception() is None:
+                # Granted just as we were cancelled - hand the slot back
+                self.release(priority)
+            else:
+                self._discard(priority, waiter)
+            raise
+
+    def _grant(self, priority: AIPriority, waited: float):
+        stats = self._stats[priority]
+        self._running += 1
+        stats.running += 1
+        stats.admitted += 1
+        stats.total_wait += waited
+        stats.max_wait = max(stats.max_wait, waited)
+
+    def release(self, priority: AIPriority):
+        """Return a slot taken by acquire()"""
+        self._running -= 1
+        self._stats[priority].running -= 1
+        self._dispatch()
+
+    def _discard(self, priority: AIPriority, waiter: _Waiter):
+        try:
+            self._queues[priority].remove(waiter)
+        except ValueError:
+            pass
+
+    def _dispatch(self):
+        """Hand free slots to queued waiters, most urgent class first"""
+        now = time.monotonic()
+        while self._running < self.capacity:
+            for priority in AIPriority:
+                queue = self._queues[priority]
+                while queue and (queue[0].future.done() or (queue[0].deadline and queue[0].deadline <= now)):
+                    waiter = queue.popleft()
+                    if not waiter.future.done():
+                        self._stats[priority].expired += 1
+                        waiter.future.set_exception(SchedulerRejected("AI call waited past its deadline"))
+                if queue and self._has_room(priority):
+                    waiter = queue.popleft()
+                    self._grant(priority, now - waiter.enqueued)
+                    waiter.future.set_result(None)
+                    break
+            else:
+                return
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, concurrency and wait times per class"""
+        classes = {}
+        for priority in AIPriority:
+            stats = self._stats[priority]
+            classes[priority.name.lower()] = {
+                "queued": len(self._queues[priority]),
+                "running": stats.running,
+                "max_running": self.limits[priority].max_running,
+                "admitted": stats.admitted,
+                "rejected": stats.rejected,
+                "expired": stats.expired,
+                "avg_wait_ms": round(stats.total_wait / stats.admitted * 1000, 1) if stats.admitted else 0.0,
+                "max_wait_ms": round(stats.max_wait * 1000, 1)
+            }
+        return {"capacity": self.capacity, "running": self._running, "classes": classes}
@@ -0,0 +1,65 @@
+"""
+Single-flight coalescing of identical concurrent async calls
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class _Call:
+    """An in-flight call and the number of callers waiting on it"""
+    
+    __slots__ = ("task", "waiters")
+    
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls that share a key into one execution.
+    
+    The first caller starts the work; later callers with the same key await
+    the same task and receive the same result or exception. A caller that is
+    cancelled only stops waiting - the shared call is cancelled once no
+    waiters remain.
+    """
+    
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self.started = 0
+        self.shared = 0
+    
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Run func() for key, or join the call already in flight"""
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(func()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            self.started += 1
+        else:
+            self.shared += 1
+        
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Unregister first so a new caller never joins a dying call
+                self._forget(key, call)
+                call.task.cancel()
+    
+    def _forget(self, key: Hashable, call: _Call):
+        """Drop a finished call unless a newer one already replaced it"""
+        if self._calls.get(key) is call:
+            del self._calls[key]
+    
+    def stats(self) -> Dict[str, int]:
+        """In-flight and coalescing counters"""
+        return {
+            "in_flight": len(self._calls),
+            "started": self.started,
+            "shared": self.shared
+        }
@@ -0,0 +1,137 @@
+"""
+Load test the /ai/* endpoints offline against the fake LLM backend
+
+Runs the app in-process with LLM_BACKEND=fake and a throwaway SQLite
+database, fires concurrent requests at each endpoint and reports
+throughput, latency percentiles and the AI call counters from /ai/status.
+No API key or network access is needed, so runs are repeatable and can
+push past the real provider's rate limits and daily budget.
+
+Usage (from backend/):
+    python -m benchmarks.ai_load_bench [--requests 200] [--concurrency 20]
+        [--latency-ms 300] [--p99-ms 1500] [--error-rate 0] [--seed 1]
+
+Other settings (AI_MAX_CONCURRENCY, AI_MICROBATCH_WINDOW_MS, ...) are read
+from the environment as usual.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+TEXTS = [
+    "call the dentist about my appointment",
+    "finish the quarterly report for the finance team",
+    "buy groceries and pick up the dry cleaning",
+    "prepare slides for monday's planning meeting",
+    "renew the car insurance before it lapses",
+    "book flights for the conference in march",
+]
+
+
+def configure(args):
+    """Point the app at the fake backend and a fresh database - must run before importing it"""
+    workdir = Path(tempfile.mkdtemp(prefix="ai_load_bench_"))
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir / 'bench.db'}"
+    os.environ["LLM_BACKEND"] = "fake"
+    os.environ["FAKE_LLM_LATENCY_MS"] = str(args.latency_ms)
+    os.environ["FAKE_LLM_LATENCY_P99_MS"] = str(args.p99_ms)
+    os.environ["FAKE_LLM_ERROR_RATE"] = str(args.error_rate)
+    os.environ["FAKE_LLM_SEED"] = str(args.seed)
+    # Every request is unique, so caches would only measure themselves
+    os.environ.setdefault("AI_PARSE_CACHE_SIZE", "0")
+    os.environ.setdefault("AI_PERSISTENT_CACHE_ENABLED", "false")
+    # Always ask the model instead of trusting the local parser
+    os.environ.setdefault("AI_LOCAL_PARSE_THRESHOLD", "2")
+    # The provider limits this backend stands in for don't apply offline
+    os.environ.setdefault("AI_RATE_LIMIT_RPS", "0")
+    os.environ.setdefault("AI_RATE_LIMIT_TPM", "0")
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * p), len(ordered) - 1)]
+
+
+async def run_endpoint(client, name, make_request, total, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, statuses = [], {}
+
+    async def one(i):
+        async with semaphore:
+            started = time.perf_counter()
+            response = await make_request(client, i)
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    elapsed = time.perf_counter() - started
+
+    ms = [latency * 1000 for latency in latencies]
+    codes = " ".join(f"{code}x{count}" for code, count in sorted(statuses.items()))
+    print(
+        f"{name:<22} {total / elapsed:7.1f} req/s   p50 {percentile(ms, 0.5):7.1f}   "
+        f"p95 {percentile(ms, 0.95):7.1f}   p99 {percentile(ms, 0.99):7.1f} ms   "
+        f"mean {statistics.mean(ms):7.1f}   [{codes}]"
+    )
+
+
+def parse(client, i):
+    return client.post("/ai/parse", json={"text": f"{TEXTS[i % len(TEXTS)]} #{i}"})
+
+
+def parse_batch(client, i):
+    return client.post("/ai/parse-batch", json={"texts": [f"{text} #{i}" for text in TEXTS]})
+
+
+def prioritize(client, i):
+    return client.post("/ai/prioritize", json={"all_open": True})
+
+
+def insights(client, i):
+    return client.get("/ai/insights")
+
+
+async def main(args):
+    import httpx
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            for i in range(args.tasks):
+                await client.post("/tasks", json={"title": f"{TEXTS[i % len(TEXTS)]} #{i}", "priority": "medium"})
+
+            print(f"fake backend: median {args.latency_ms} ms, p99 {args.p99_ms} ms, error rate {args.error_rate}")
+            for name, make_request in [
+                ("POST /ai/parse", parse),
+                ("POST /ai/parse-batch", parse_batch),
+                ("POST /ai/prioritize", prioritize),
+                ("GET /ai/insights", insights),
+            ]:
+                await run_endpoint(client, name, make_request, args.requests, args.concurrency)
+
+            status = (await client.get("/ai/status")).json()
+            print(f"backend {status['backend']}   breaker {status['circuit_breaker']}")
+            print(f"scheduler {status['scheduler']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--tasks", type=int, default=50, help="Open tasks to seed for prioritize/insights")
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--p99-ms", type=float, default=1500)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    configure(args)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    asyncio.run(main(args))
@@ -0,0 +1,94 @@
+"""
+Benchmark JSON extraction from LLM responses
+
+Runs the extractor over corpus/llm_responses.jsonl and compares it with the
+previous regex-based extractor: how many responses yield the expected
+object, and the time per call.
+
+Usage (from backend/):
+    python -m benchmarks.json_extract_bench [--rounds 2000]
+
+Corpus lines are {"kind", "required", "response", "expect"}; required maps
+keys to type names ("str", "list", "dict") and expect is the object the
+extractor should return, or null when nothing usable should be found.
+Append responses captured from the model to keep the corpus realistic.
+"""
+import argparse
+import json
+import re
+import time
+from pathlib import Path
+
+from app.services.json_extract import extract_json
+
+CORPUS = Path(__file__).parent / "corpus" / "llm_responses.jsonl"
+TYPES = {"str": str, "list": list, "dict": dict, "int": int}
+
+
+def legacy_extract(text: str) -> dict:
+    """The extractor this module replaced, kept as the baseline"""
+    text = text.strip()
+    if text.startswith("```"):
+        text = re.sub(r'^```\w*\n?', '', text)
+        text = re.sub(r'\n?```$', '', text)
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        match = re.search(r'\{[^{}]*\}', text, re.DOTALL)
+        if match:
+            try:
+                return json.loads(match.group())
+            except ValueError:
+                pass
+        return {}
+
+
+def load_corpus():
+    cases = []
+    with open(CORPUS) as f:
+        for line in f:
+            if line.strip():
+                case = json.loads(line)
+                case["required"] = {k: TYPES[v] for k, v in (case["required"] or {}).items()}
+                cases.append(case)
+    return cases
+
+
+def correct(result, case) -> bool:
+    expected = case["expect"] or {}
+    return result == expected
+
+
+def run(name, extract, cases, rounds):
+    failures = [case for case in cases if not correct(extract(case), case)]
+
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for case in cases:
+            extract(case)
+    per_call = (time.perf_counter() - started) / (rounds * len(cases)) * 1e6
+
+    print(f"{name:<10} {len(cases) - len(failures):>3}/{len(cases)} correct   {per_call:7.1f} us/call")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rounds", type=int, default=2000)
+    parser.add_argument("--verbose", action="store_true", help="List the responses each extractor gets wrong")
+    args = parser.parse_args()
+
+    cases = load_corpus()
+    results = {
+        "legacy": run("legacy", lambda case: legacy_extract(case["response"]), cases, args.rounds),
+        "current": run("current", lambda case: extract_json(case["response"], case["required"]), cases, args.rounds)
+    }
+
+    if args.verbose:
+        for name, failures in results.items():
+            for case in failures:
+                print(f"[{name}] {case['kind']}: {case['response'][:70]!r}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Local task parser: weekday abbreviations, keyword categories and the
+confidence that decides whether the LLM is skipped
+
+Run from backend/: python -m unittest discover tests
+"""
+import unittest
+from datetime import datetime
+
+from app.schemas import Category
+from app.services.local_parser import UNCERTAIN_CONFIDENCE, parse_task_text
+
+# A Friday
+NOW = datetime(2026, 10, 16, 12, 0)
+# Default ai_local_parse_threshold
+SKIP_THRESHOLD = 0.85
+
+
+def parse(text):
+    return parse_task_text(text, now=NOW)
+
+
+class WeekdayAbbreviationTests(unittest.TestCase):
+    def test_abbreviations_inside_ordinary_words_are_not_dates(self):
+        for text in ["Buy sun screen", "Study for the SAT", "Email Fri about the contract"]:
+            with self.subTest(text=text):
+                result = parse(text)
+                self.assertIsNone(result["due_date"])
+                self.assertEqual(result["title"].lower(), text.lower())
+
+    def test_abbreviation_after_preposition_or_modifier(self):
+        cases = {
+            "call mom on fri": ("Call mom", "2026-10-23"),
+            "report due by mon": ("Report", "2026-10-19"),
+            "Dentist next tue": ("Dentist", "2026-10-20"),
+        }
+        for text, (title, day) in cases.items():
+            with self.subTest(text=text):
+                result = parse(text)
+                self.assertEqual(result["title"], title)
+                self.assertTrue(result["due_date"].startswith(day))
+
+    def test_abbreviation_as_last_word(self):
+        self.assertTrue(parse("gym sat.")["due_date"].startswith("2026-10-17"))
+        self.assertTrue(parse("meeting thu")["due_date"].startswith("2026-10-22"))
+
+    def test_abbreviation_only_dates_go_to_the_llm(self):
+        for text in ["c mon", "meeting thu", "call mom on fri", "gym sat."]:
+            with self.subTest(text=text):
+                self.assertLess(parse(text)["confidence"], SKIP_THRESHOLD)
+
+    def test_full_weekday_names_keep_high_confidence(self):
+        result = parse("pay rent friday")
+        self.assertEqual(result["title"], "Pay rent")
+        self.assertTrue(result["due_date"].startswith("2026-10-23"))
+        self.assertGreaterEqual(result["confidence"], SKIP_THRESHOLD)
+
+
+class DateRangeTests(unittest.TestCase):
+    def test_durations_past_the_calendar_have_no_date(self):
+        for text in ["finish thesis in 9999999 days", "ship it in 99999999 weeks", "renew in 999999 months"]:
+            with self.subTest(text=text):
+                result = parse(text)
+                self.assertIsNone(result["due_date"])
+                self.assertLess(result["confidence"], SKIP_THRESHOLD)
+
+    def test_fraction_is_not_a_date(self):
+        result = parse("2/3 of budget due")
+        self.assertIsNone(result["due_date"])
+        self.assertEqual(result["title"], "2/3 of budget")
+
+    def test_slash_date_after_preposition_or_at_end(self):
+        self.assertTrue(parse("report due 3/4")["due_date"].startswith("2027-03-04"))
+        self.assertTrue(parse("pay rent 12/31")["due_date"].startswith("2026-12-31"))
+
+    def test_two_digit_year_is_the_nearest(self):
+        self.assertTrue(parse("pay rent 12/31/99")["due_date"].startswith("1999-12-31"))
+        self.assertTrue(parse("dentist on 11/5/27")["due_date"].startswith("2027-11-05"))
+
+
+class CategoryKeywordTests(unittest.TestCase):
+    def test_book_is_not_learning(self):
+        self.assertEqual(parse("return the book to library")["category"], Category.ERRANDS.value)
+        self.assertNotEqual(parse("Book a table at Nopa")["category"], Category.LEARNING.value)
+
+    def test_competing_keywords_go_to_the_llm(self):
+        result = parse("pay the bills and buy groceries")
+        self.assertLessEqual(result["confidence"], UNCERTAIN_CONFIDENCE)
+
+    def test_single_category_keeps_high_confidence(self):
+        result = parse("read chapter 3 for the course")
+        self.assertEqual(result["category"], Category.LEARNING.value)
+        self.assertGreaterEqual(result["confidence"], SKIP_THRESHOLD)
+
+
+if __name__ == "__main__":
+    unittest.main()